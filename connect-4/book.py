@@ -0,0 +1,140 @@
+# Opening book for the Connect 4 AI
+# The first moves cost the most to search (empty board, every column open) but are the same every game,
+# so they are searched once offline and written to a sorted binary file:
+#   python book.py --ply 6 --depth 10
+#
+# File layout (little endian):
+#   header   magic "C4BK", rows, columns, max ply, search depth (1 byte each), record count (4 bytes)
+#   records  position hash (8 bytes), best column (1 byte), score (4 bytes), sorted by hash
+# Only positions with the AI to move are stored, and a position and its mirror image share one record.
+# The game looks moves up with a binary search over an mmap of the file, so it never reads the whole book.
+import argparse
+import mmap
+import os
+import struct
+
+import engine
+from engine import (ROW_COUNT, COLUMN_COUNT, PLAYER_PIECE, AI_PIECE, DEFAULT_CONFIG, create_board, drop_piece, undo_piece,
+	get_valid_locations, winning_move, create_search_pool)
+
+MAGIC = b"C4BK"
+HEADER = struct.Struct("<4sBBBBI")
+RECORD = struct.Struct("<QBi")
+
+# Scores are stored in 4 bytes, wins and losses get clamped
+SCORE_MIN = -2**31
+SCORE_MAX = 2**31 - 1
+
+# Where the game looks for the book
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+
+
+class OpeningBook:
+	def __init__(self, path):
+		self.file = open(path, "rb")
+		self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+		magic, rows, columns, self.max_ply, self.depth, self.count = HEADER.unpack_from(self.data, 0)
+		if magic != MAGIC or (rows, columns) != (ROW_COUNT, COLUMN_COUNT):
+			self.close()
+			raise ValueError(f"{path} is not an opening book for a {ROW_COUNT}x{COLUMN_COUNT} board")
+
+	def close(self):
+		self.data.close()
+		self.file.close()
+
+	# (column, score) stored for this hash or None, binary search over the records
+	def find(self, key):
+		low = 0
+		high = self.count
+		while low < high:
+			mid = (low + high) // 2
+			mid_key, col, score = RECORD.unpack_from(self.data, HEADER.size + mid*RECORD.size)
+			if mid_key < key:
+				low = mid + 1
+			elif mid_key > key:
+				high = mid
+			else:
+				return col, score
+		return None
+
+	# Best (column, score) for the AI in this position, or None if the book doesnt have it
+	# Books are only made for the standard board
+	def lookup(self, board):
+		if board.config is not DEFAULT_CONFIG or board.moves > self.max_ply:
+			return None
+		entry = self.find(board.hash)
+		if entry is not None:
+			return entry
+		# Might be stored as its mirror image
+		entry = self.find(board.mirrored().hash)
+		if entry is not None:
+			return COLUMN_COUNT-1-entry[0], entry[1]
+		return None
+
+
+# The book at path, or None if it hasnt been generated
+def open_book(path=BOOK_PATH):
+	if not os.path.exists(path):
+		return None
+	return OpeningBook(path)
+
+
+# Every position up to max_ply pieces with the AI to move and no winner yet, as {hash: board}
+# Each position is kept in whichever of its two mirror images has the smaller hash
+def book_positions(max_ply):
+	positions = {}
+	seen = set()
+
+	def collect(board, piece, plies_left):
+		mirror = board.mirrored()
+		canonical = board if board.hash <= mirror.hash else mirror
+		# The same pieces can come up with either side to move depending on who went first
+		if (canonical.hash, piece) in seen:
+			return
+		seen.add((canonical.hash, piece))
+		if piece == AI_PIECE:
+			positions[canonical.hash] = canonical.copy()
+		if plies_left == 0:
+			return
+
+		for col in get_valid_locations(board):
+			row = board.heights[col]
+			drop_piece(board, row, col, piece)
+			if not winning_move(board, piece):
+				collect(board, 3 - piece, plies_left - 1)
+			undo_piece(board, row, col, piece)
+
+	for first in (PLAYER_PIECE, AI_PIECE):
+		collect(create_board(), first, max_ply)
+	return positions
+
+
+# Runs in the pool processes
+def search_book_position(board, depth):
+	# Fresh table every time so the book comes out the same whatever order the positions are searched in
+	engine.searcher.new_game()
+	return engine.searcher.search(board, depth)
+
+
+def generate(path, max_ply, depth, workers=None):
+	positions = book_positions(max_ply)
+	keys = sorted(positions)
+	with create_search_pool(workers) as pool:
+		results = pool.map(search_book_position, [positions[key] for key in keys], [depth]*len(keys), chunksize=16)
+		with open(path, "wb") as f:
+			f.write(HEADER.pack(MAGIC, ROW_COUNT, COLUMN_COUNT, max_ply, depth, len(keys)))
+			for key, (col, score) in zip(keys, results):
+				f.write(RECORD.pack(key, col, max(SCORE_MIN, min(SCORE_MAX, score))))
+	return len(keys)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Search every opening position up to a ply and write the opening book")
+	parser.add_argument("--ply", type=int, default=6, help="deepest position in the book, in pieces on the board")
+	parser.add_argument("--depth", type=int, default=10, help="minimax depth each position is searched to")
+	parser.add_argument("--output", default=BOOK_PATH)
+	parser.add_argument("--workers", type=int, help="search processes, defaults to one per core")
+	args = parser.parse_args()
+
+	count = generate(args.output, args.ply, args.depth, args.workers)
+	print(f"Wrote {count} positions to {args.output}")
@@ -0,0 +1,855 @@
+# Connect 4 engine: board, evaluation and minimax search
+# Doesnt touch pygame so it can be imported by tools and other processes without opening a window
+import numpy as np
+import random
+import math
+import time
+import threading
+import os
+import concurrent.futures
+
+# Size of the standard game, other sizes and connect lengths go through board_config
+ROW_COUNT = 6
+COLUMN_COUNT = 7
+
+# Number corresponding to color
+EMPTY = 0
+PLAYER_PIECE = 1
+AI_PIECE = 2
+
+WINDOW_LENGTH = 4
+
+# Try likely good moves first so alpha beta can cut more of the tree
+# Turn off to see how many more nodes minimax needs in plain column order
+MOVE_ORDERING = True
+
+# Values minimax gives a finished game
+AI_WIN_SCORE = 100000000000000
+PLAYER_WIN_SCORE = -10000000000000
+
+
+def eval_window(window, piece):
+	score = 0
+	# Pieces in a row needed to win
+	length = len(window)
+
+	opp_piece = PLAYER_PIECE
+	if piece == PLAYER_PIECE:
+		opp_piece = AI_PIECE
+
+	# If piece in given position would make it 4 in a row, AI gotta drop there.
+	# drop in front of own AI piece to win game or player piece to stop them from winning
+	if window.count(piece) == length:
+		score += 100
+	elif window.count(piece) == length-1 and window.count(EMPTY) == 1:
+		score += 5
+	elif window.count(piece) == length-2 and window.count(EMPTY) == 2:
+		score += 2
+
+	# Blocks if player getting 4 in a row
+	if window.count(opp_piece) == length-1 and window.count(EMPTY) == 1:
+		score -= 4
+
+	return score
+
+
+# Every window score_position looks at as a list of (row, col) cells
+def window_cells(rows, columns, connect):
+	windows = []
+	# Using -(connect-1) cuz the last window has to start connect-1 cells before the edge
+	reach = connect - 1
+
+	# Horizontal
+	for r in range(rows):
+		for c in range(columns-reach):
+			windows.append([(r, c+i) for i in range(connect)])
+
+	# Vertical
+	for c in range(columns):
+		for r in range(rows-reach):
+			windows.append([(r+i, c) for i in range(connect)])
+
+	# Positive Slope Diagonal
+	for r in range(rows-reach):
+		for c in range(columns-reach):
+			windows.append([(r+i, c+i) for i in range(connect)])
+
+	# Negative Slope Diagonal
+	for r in range(rows-reach):
+		for c in range(columns-reach):
+			windows.append([(r+reach-i, c+i) for i in range(connect)])
+
+	return windows
+
+
+# Everything the engine needs to know about one board size, worked out once when the config is made
+# Get them through board_config so every board of the same size shares one
+class BoardConfig:
+	def __init__(self, rows, columns, connect):
+		if connect < 2 or connect > max(rows, columns):
+			raise ValueError(f"Can't connect {connect} on a {rows}x{columns} board")
+		self.rows = rows
+		self.columns = columns
+		self.connect = connect
+		self.cells = rows*columns
+		self.center = columns//2
+
+		# Bitboard layout
+		# Every column gets rows+1 bits, the extra bit on top is always empty so shifting a line never wraps into the next column
+		# Bit for (row, col) is col*column_height + row, row 0 is the bottom like in the old numpy board
+		self.column_height = rows + 1
+		# Shifts that move a piece one step along a line: vertical, horizontal, positive diagonal, negative diagonal
+		self.win_shifts = (1, self.column_height, self.column_height + 1, self.column_height - 1)
+
+		# Zobrist keys: one random 64 bit number per (piece, cell), a position's hash is the XOR of the keys of its pieces
+		# Seeded so the same position hashes the same every run
+		zobrist_random = random.Random(0xC0FFEE)
+		self.zobrist = [[zobrist_random.getrandbits(64) for cell in range(columns*self.column_height)] for piece in range(3)]
+
+		# All the windows score_position looks at (69 on the standard board), as bitmasks
+		windows = window_cells(rows, columns, connect)
+		self.window_masks = [sum(self.cell_bit(r, c) for r, c in cells) for cells in windows]
+		self.center_mask = sum(self.cell_bit(r, self.center) for r in range(rows))
+		# cell_windows[bit index] lists the windows that go through that cell
+		self.cell_windows = [[w for w, mask in enumerate(self.window_masks) if mask >> cell & 1] for cell in range(columns*self.column_height)]
+
+		# eval_window only cares about how many own and opponent pieces are in the window
+		# so window_scores[own][opp] holds its answer for every combination
+		self.window_scores = [[eval_window([AI_PIECE]*own + [PLAYER_PIECE]*opp + [EMPTY]*(connect-own-opp), AI_PIECE) if own + opp <= connect else 0
+			for opp in range(connect+1)] for own in range(connect+1)]
+		# score_position of the empty board for either side, not 0 when eval_window scores an empty window (connect 2)
+		self.empty_score = len(self.window_masks) * self.window_scores[0][0]
+
+		# Columns from the middle out, a piece in the middle is part of the most windows
+		self.center_order = sorted(range(columns), key=lambda col: abs(col - self.center))
+
+		# For batch evaluation: window_cell_indices[w] holds the flat index (row*columns + col) of the cells in window w
+		self.window_cell_indices = np.array([[r*columns + c for r, c in cells] for cells in windows], dtype=np.intp).reshape(len(windows), connect)
+		self.window_scores_array = np.array(self.window_scores, dtype=np.int64)
+
+	def cell_bit(self, row, col):
+		return 1 << (col*self.column_height + row)
+
+	# Pickled as its size so boards sent to other processes pick up that process's shared config
+	def __reduce__(self):
+		return board_config, (self.rows, self.columns, self.connect)
+
+	def __repr__(self):
+		return f"board_config({self.rows}, {self.columns}, {self.connect})"
+
+
+# One shared BoardConfig per (rows, columns, connect)
+board_configs = {}
+
+def board_config(rows=ROW_COUNT, columns=COLUMN_COUNT, connect=WINDOW_LENGTH):
+	key = (rows, columns, connect)
+	if key not in board_configs:
+		board_configs[key] = BoardConfig(rows, columns, connect)
+	return board_configs[key]
+
+
+DEFAULT_CONFIG = board_config()
+
+
+class Bitboard:
+	__slots__ = ("config", "pieces", "heights", "moves", "hash", "window_counts", "scores", "fours")
+
+	def __init__(self, config=DEFAULT_CONFIG):
+		self.config = config
+		# One int per piece (64 bits is enough for the standard board), indexed by the piece number so pieces[EMPTY] just stays 0
+		self.pieces = [0, 0, 0]
+		# Next open row of every column
+		self.heights = [0] * config.columns
+		self.moves = 0
+		self.hash = 0
+		# window_counts[piece][w] is how many of piece's pieces are in window w of config.window_masks
+		self.window_counts = [[0] * len(config.window_masks) for piece in range(3)]
+		# score_position(board, piece) kept up to date by drop_piece and undo_piece
+		self.scores = [0, config.empty_score, config.empty_score]
+		# How many windows each piece fills completely, anything above 0 is a win
+		self.fours = [0, 0, 0]
+
+	def copy(self):
+		board = Bitboard.__new__(Bitboard)
+		board.config = self.config
+		board.pieces = self.pieces[:]
+		board.heights = self.heights[:]
+		board.moves = self.moves
+		board.hash = self.hash
+		board.window_counts = [counts[:] for counts in self.window_counts]
+		board.scores = self.scores[:]
+		board.fours = self.fours[:]
+		return board
+
+	def get(self, row, col):
+		bit = self.config.cell_bit(row, col)
+		if self.pieces[PLAYER_PIECE] & bit:
+			return PLAYER_PIECE
+		if self.pieces[AI_PIECE] & bit:
+			return AI_PIECE
+		return EMPTY
+
+	# Same position with the two colors swapped, lets the AI search for the player's side
+	def swapped(self):
+		board = Bitboard(self.config)
+		for c in range(self.config.columns):
+			for r in range(self.heights[c]):
+				drop_piece(board, r, c, 3 - self.get(r, c))
+		return board
+
+	# Same position flipped left to right, it has the same value with the columns mirrored
+	def mirrored(self):
+		board = Bitboard(self.config)
+		last = self.config.columns - 1
+		for c in range(self.config.columns):
+			for r in range(self.heights[c]):
+				drop_piece(board, r, last-c, self.get(r, c))
+		return board
+
+	# Same (rows, columns) layout the game used to keep, for printing and numpy tools
+	def to_array(self):
+		array = np.zeros((self.config.rows, self.config.columns), dtype=np.int8)
+		for c in range(self.config.columns):
+			for r in range(self.heights[c]):
+				array[r][c] = self.get(r, c)
+		return array
+
+
+def create_board(config=DEFAULT_CONFIG):
+	board = Bitboard(config)
+	return board
+
+# Pieces always land on top of their column so row has to be get_next_open_row(board, col)
+def drop_piece(board, row, col, piece):
+	config = board.config
+	cell = col*config.column_height + row
+	board.pieces[piece] |= 1 << cell
+	board.heights[col] = row + 1
+	board.moves += 1
+	board.hash ^= config.zobrist[piece][cell]
+
+	# Only the windows going through this cell change score
+	window_scores = config.window_scores
+	full = config.connect - 1
+	opp_piece = 3 - piece
+	own_counts = board.window_counts[piece]
+	opp_counts = board.window_counts[opp_piece]
+	own_gain = 0
+	opp_gain = 0
+	for w in config.cell_windows[cell]:
+		own = own_counts[w]
+		opp = opp_counts[w]
+		own_gain += window_scores[own+1][opp] - window_scores[own][opp]
+		opp_gain += window_scores[opp][own+1] - window_scores[opp][own]
+		own_counts[w] = own + 1
+		if own == full:
+			board.fours[piece] += 1
+	if col == config.center:
+		own_gain += 3
+	board.scores[piece] += own_gain
+	board.scores[opp_piece] += opp_gain
+
+# Takes back drop_piece(board, row, col, piece), row has to be the top piece of col
+def undo_piece(board, row, col, piece):
+	config = board.config
+	cell = col*config.column_height + row
+	board.pieces[piece] ^= 1 << cell
+	board.heights[col] = row
+	board.moves -= 1
+	board.hash ^= config.zobrist[piece][cell]
+
+	window_scores = config.window_scores
+	full = config.connect - 1
+	opp_piece = 3 - piece
+	own_counts = board.window_counts[piece]
+	opp_counts = board.window_counts[opp_piece]
+	own_loss = 0
+	opp_loss = 0
+	for w in config.cell_windows[cell]:
+		own = own_counts[w] - 1
+		opp = opp_counts[w]
+		own_loss += window_scores[own+1][opp] - window_scores[own][opp]
+		opp_loss += window_scores[opp][own+1] - window_scores[opp][own]
+		own_counts[w] = own
+		if own == full:
+			board.fours[piece] -= 1
+	if col == config.center:
+		own_loss += 3
+	board.scores[piece] -= own_loss
+	board.scores[opp_piece] -= opp_loss
+
+def is_valid_location(board, col):
+	return board.heights[col] < board.config.rows
+
+def get_next_open_row(board, col):
+	if board.heights[col] < board.config.rows:
+		return board.heights[col]
+
+def print_board(board):
+	print(np.flip(board.to_array(), 0))
+
+def winning_move(board, piece):
+	# AND the board with itself shifted one step along a line, every bit left over starts a 2 in a row
+	# Doing it again with two steps leaves only bits that start a 4 in a row, and so on for longer lines
+	bits = board.pieces[piece]
+	connect = board.config.connect
+	for shift in board.config.win_shifts:
+		run = bits
+		length = 1
+		while length*2 <= connect:
+			run &= run >> (length*shift)
+			length *= 2
+		if length < connect:
+			run &= run >> ((connect-length)*shift)
+		if run:
+			return True
+	return False
+
+
+# The board keeps this score up to date as pieces are dropped, see full_score_position for what it adds up
+def score_position(board, piece):
+	return board.scores[piece]
+
+
+def full_score_position(board, piece):
+	config = board.config
+	own = board.pieces[piece]
+	opp = board.pieces[PLAYER_PIECE if piece == AI_PIECE else AI_PIECE]
+
+	# Score center column
+	score = (own & config.center_mask).bit_count() * 3
+
+	# Score every horizontal, vertical and diagonal window
+	for mask in config.window_masks:
+		score += config.window_scores[(own & mask).bit_count()][(opp & mask).bit_count()]
+
+	return score
+
+
+# Batch evaluation
+# Scores a whole (N, rows, columns) array of boards at once, same piece numbers as the game
+# Windows are gathered through config.window_cell_indices, a (69, 4) table on the standard board
+
+# Boards are gathered this many at a time so the (chunk, windows, connect) array stays small
+# Boards are made int8 first whatever they came in as, a chunk of float64 boards would gather to 8 times the size
+BATCH_CHUNK_SIZE = 65536
+
+
+# Yields (start, own, opp) with own[i, w] and opp[i, w] counting each side's pieces in window w of board start+i
+def batch_window_counts(boards, piece, config=DEFAULT_CONFIG):
+	boards = np.asarray(boards, dtype=np.int8).reshape(-1, config.cells)
+	opp_piece = PLAYER_PIECE if piece == AI_PIECE else AI_PIECE
+	for start in range(0, len(boards), BATCH_CHUNK_SIZE):
+		windows = boards[start:start+BATCH_CHUNK_SIZE, config.window_cell_indices]
+		own = np.count_nonzero(windows == piece, axis=2)
+		opp = np.count_nonzero(windows == opp_piece, axis=2)
+		yield start, own, opp
+
+
+# score_position for every board in boards
+def batch_score_position(boards, piece, config=DEFAULT_CONFIG):
+	boards = np.asarray(boards, dtype=np.int8).reshape(-1, config.rows, config.columns)
+	# Score center column
+	scores = np.count_nonzero(boards[:, :, config.center] == piece, axis=1).astype(np.int64) * 3
+	for start, own, opp in batch_window_counts(boards, piece, config):
+		scores[start:start+len(own)] += config.window_scores_array[own, opp].sum(axis=1)
+	return scores
+
+
+# winning_move for every board in boards, as a bool array
+def batch_winning_move(boards, piece, config=DEFAULT_CONFIG):
+	boards = np.asarray(boards, dtype=np.int8).reshape(-1, config.rows, config.columns)
+	wins = np.zeros(len(boards), dtype=bool)
+	for start, own, opp in batch_window_counts(boards, piece, config):
+		wins[start:start+len(own)] = (own == config.connect).any(axis=1)
+	return wins
+
+
+def is_terminal_node(board):
+	return winning_move(board, PLAYER_PIECE) or winning_move(board, AI_PIECE) or board.moves == board.config.cells
+
+
+# Bound types for transposition table entries
+EXACT = 0
+LOWER_BOUND = 1 # Real value is at least the stored value (search failed high)
+UPPER_BOUND = 2 # Real value is at most the stored value (search failed low)
+
+
+class TranspositionTable:
+	# size is rounded down to a power of 2 so the hash can be masked into a slot
+	def __init__(self, size=1 << 20):
+		self.mask = (1 << (size.bit_length() - 1)) - 1
+		self.entries = [None] * (self.mask + 1)
+		# Bumped every search so entries from earlier turns can be told apart
+		self.generation = 0
+
+	def lookup(self, key):
+		entry = self.entries[key & self.mask]
+		if entry is not None and entry[0] == key:
+			return entry
+		return None
+
+	# Entries are (key, depth, value, bound, move, generation)
+	def store(self, key, depth, value, bound, move):
+		index = key & self.mask
+		old = self.entries[index]
+		# Depth preferred replacement: a shallower result only kicks out an entry of the same position or one left over from an older search
+		if old is None or old[0] == key or depth >= old[1] or old[5] != self.generation:
+			self.entries[index] = (key, depth, value, bound, move, self.generation)
+
+	def new_search(self):
+		self.generation += 1
+
+	def clear(self):
+		self.entries = [None] * (self.mask + 1)
+		self.generation = 0
+
+
+# Raised inside minimax when the time budget runs out or the search is cancelled, the half finished depth is thrown away
+class SearchTimeout(Exception):
+	pass
+
+
+class Searcher:
+	# How many nodes to visit between looks at the clock
+	CLOCK_CHECK_INTERVAL = 256
+
+	# Searches boards made with config, the standard board unless told otherwise
+	def __init__(self, table=None, ordering=MOVE_ORDERING, config=DEFAULT_CONFIG):
+		# Kept between AI turns so a new turn starts with what the last one already searched
+		if table is None:
+			table = TranspositionTable()
+		self.table = table
+		self.ordering = ordering
+		self.config = config
+		self.nodes = 0
+		# perf_counter time the search has to stop at, None means search until done
+		self.deadline = None
+		# Deadline AIWorker.ponder_hit sets from another thread while think is running
+		# Kept apart from deadline so think and solve clearing theirs cant lose it, AIWorker clears it between searches
+		self.ponder_deadline = None
+		# False while think is on depth 1, which has to finish so there is a move to play
+		self.can_stop = False
+		# Set from another thread to make the running search give up as soon as it looks at the clock
+		self.stop_requested = False
+		# Two killer moves per number of pieces on the board: moves that caused a cutoff in a sibling node
+		self.killers = [[None, None] for ply in range(config.cells + 1)]
+		# history[piece][col] grows every time playing col caused a cutoff, deeper cutoffs count more
+		self.history = [[0] * config.columns for piece in range(3)]
+		# Exact endgame solver (see solver.py), think hands the position to it once few enough cells are empty
+		self.solver = None
+		# Search statistics (see stats.py), None to not collect any
+		self.stats = None
+
+	def new_game(self):
+		self.table.clear()
+		self.history = [[0] * self.config.columns for piece in range(3)]
+
+	def new_search(self):
+		self.table.new_search()
+		self.killers = [[None, None] for ply in range(self.config.cells + 1)]
+		# Old history still helps but shouldnt outweigh what this search finds
+		for piece_history in self.history:
+			for col in range(self.config.columns):
+				piece_history[col] //= 2
+
+	def search(self, board, depth):
+		self.new_search()
+		self.deadline = None
+		self.can_stop = True
+		if self.stats is None:
+			return self.minimax(board, depth, -math.inf, math.inf, True)
+		self.stats.start_move(self, board)
+		column, value = self.minimax(board, depth, -math.inf, math.inf, True)
+		self.stats.end_depth(self, depth)
+		self.stats.end_move(self, column, value, depth)
+		return column, value
+
+	# Iterative deepening: search depth 1, 2, 3... until time_budget_ms runs out
+	# A time_budget_ms of None searches until max_depth or until stop_requested is set
+	# Returns (column, value, depth) from the deepest search that finished, column is None if it was cancelled during depth 1
+	# or the board is full
+	def think(self, board, time_budget_ms, max_depth=None):
+		start = time.perf_counter()
+		# No point looking further ahead than the number of empty cells
+		empty_cells = board.config.cells - board.moves
+		if empty_cells == 0:
+			return None, 0, 0
+		if max_depth is None or max_depth > empty_cells:
+			max_depth = empty_cells
+
+		self.new_search()
+		stats = self.stats
+		if stats is not None:
+			stats.start_move(self, board)
+		if self.solver is not None and self.solver.can_solve(board):
+			result = self.solve(board, start, time_budget_ms, empty_cells)
+			if result is not None or self.stop_requested:
+				result = result or (None, None, 0)
+				if stats is not None:
+					stats.end_move(self, *result, solved=result[0] is not None)
+				return result
+			# The solver ran out of time, its time doesnt count towards depth 1
+			if stats is not None:
+				stats.start_depth(self)
+
+		column = None
+		value = None
+		completed_depth = 0
+		try:
+			# Depth 1 always runs to the end so there is a move even with a tiny budget
+			self.can_stop = False
+			column, value = self.minimax(board, 1, -math.inf, math.inf, True)
+			completed_depth = 1
+			if stats is not None:
+				stats.end_depth(self, 1)
+
+			self.can_stop = True
+			if time_budget_ms is not None:
+				self.deadline = start + time_budget_ms/1000
+			for depth in range(2, max_depth+1):
+				# A forced win or loss wont change by looking deeper
+				if value >= AI_WIN_SCORE or value <= PLAYER_WIN_SCORE:
+					break
+				column, value = self.minimax(board, depth, -math.inf, math.inf, True)
+				completed_depth = depth
+				if stats is not None:
+					stats.end_depth(self, depth)
+		except SearchTimeout:
+			pass
+		finally:
+			self.deadline = None
+			self.can_stop = False
+
+		if stats is not None:
+			stats.end_move(self, column, value, completed_depth)
+		return column, value, completed_depth
+
+	# Solves the position to the end, (column, value, empty cells) or None if the solver ran out of time
+	# It gets half the budget, whatever is left goes to the normal search
+	def solve(self, board, start, time_budget_ms, empty_cells):
+		self.can_stop = True
+		if time_budget_ms is not None:
+			self.deadline = start + time_budget_ms/2000
+		solver_nodes = self.solver.nodes
+		try:
+			column, score = self.solver.best_move(board, AI_PIECE, self.out_of_time)
+		except SearchTimeout:
+			return None
+		finally:
+			self.nodes += self.solver.nodes - solver_nodes
+			self.deadline = None
+			self.can_stop = False
+
+		if score > 0:
+			value = AI_WIN_SCORE
+		elif score < 0:
+			value = PLAYER_WIN_SCORE
+		else:
+			value = 0
+		return column, value, empty_cells
+
+	def out_of_time(self):
+		if self.stop_requested:
+			return True
+		if not self.can_stop:
+			return False
+		deadline = self.deadline
+		ponder_deadline = self.ponder_deadline
+		if ponder_deadline is not None and (deadline is None or ponder_deadline < deadline):
+			deadline = ponder_deadline
+		return deadline is not None and time.perf_counter() >= deadline
+
+	def minimax(self, board, depth, alpha, beta, maximizingPlayer):
+		self.nodes += 1
+		if self.nodes % self.CLOCK_CHECK_INTERVAL == 0 and self.out_of_time():
+			raise SearchTimeout()
+
+		# Same as is_terminal_node but read straight off the counts the board keeps
+		fours = board.fours
+		if fours[AI_PIECE]:
+			return (None, AI_WIN_SCORE)
+		elif fours[PLAYER_PIECE]:
+			return (None, PLAYER_WIN_SCORE)
+		elif board.moves == self.config.cells: # Game is over, no more valid moves
+			return (None, 0)
+		elif depth == 0:
+			if self.stats is not None:
+				self.stats.leaf_evals += 1
+			return (None, board.scores[AI_PIECE])
+
+		# Whose turn it is follows from the pieces on the board so the hash alone identifies the node
+		entry = self.table.lookup(board.hash)
+		if entry is not None and entry[1] >= depth:
+			bound = entry[3]
+			if bound == EXACT:
+				return entry[4], entry[2]
+			elif bound == LOWER_BOUND:
+				alpha = max(alpha, entry[2])
+			else:
+				beta = min(beta, entry[2])
+			if alpha >= beta:
+				return entry[4], entry[2]
+
+		alpha_orig = alpha
+		beta_orig = beta
+		piece = AI_PIECE if maximizingPlayer else PLAYER_PIECE
+		if self.ordering:
+			valid_locations = self.order_moves(board, piece, None if entry is None else entry[4])
+		else:
+			valid_locations = get_valid_locations(board)
+		# Every child score beats +-inf so the first valid column is only a placeholder
+		column = valid_locations[0]
+
+		if maximizingPlayer: # AI
+			value = -math.inf
+			for col in valid_locations:
+				row = board.heights[col]
+				drop_piece(board, row, col, AI_PIECE)
+				# Always take the move back, even when the search runs out of time below it
+				try:
+					# maximizingPlayer == False so 
+					new_score = self.minimax(board, depth-1, alpha, beta, False)[1]
+				finally:
+					undo_piece(board, row, col, AI_PIECE)
+				if new_score > value:
+					value = new_score
+					column = col
+
+				alpha = max(alpha, value)
+				if alpha >= beta:
+					self.record_cutoff(board, piece, col, depth, valid_locations)
+					break
+
+		else: # Minimizing player / HUMAN PLAYER
+			value = math.inf
+			for col in valid_locations:
+				row = board.heights[col]
+				drop_piece(board, row, col, PLAYER_PIECE)
+				try:
+					new_score = self.minimax(board, depth-1, alpha, beta, True)[1]
+				finally:
+					undo_piece(board, row, col, PLAYER_PIECE)
+				if new_score < value:
+					value = new_score
+					column = col
+
+				beta = min(beta, value)
+				if alpha >= beta:
+					self.record_cutoff(board, piece, col, depth, valid_locations)
+					break
+
+		# A value outside the window we were called with is only a bound on the real one
+		if value <= alpha_orig:
+			bound = UPPER_BOUND
+		elif value >= beta_orig:
+			bound = LOWER_BOUND
+		else:
+			bound = EXACT
+		self.table.store(board.hash, depth, value, bound, column)
+
+		return column, value
+
+	# Valid columns, best first: the table's best move, then killers, then by history with ties broken center first
+	def order_moves(self, board, piece, best_move):
+		history = self.history[piece]
+		killers = self.killers[board.moves]
+		rows = self.config.rows
+		moves = [col for col in self.config.center_order if board.heights[col] < rows]
+		# sort is stable so columns with the same history stay center first
+		moves.sort(key=lambda col: history[col], reverse=True)
+		for killer in reversed(killers):
+			if killer is not None and killer in moves:
+				moves.remove(killer)
+				moves.insert(0, killer)
+		if best_move is not None and best_move in moves:
+			moves.remove(best_move)
+			moves.insert(0, best_move)
+		return moves
+
+	def record_cutoff(self, board, piece, col, depth, moves):
+		if self.stats is not None:
+			self.stats.cutoff(moves.index(col))
+		killers = self.killers[board.moves]
+		if killers[0] != col:
+			killers[1] = killers[0]
+			killers[0] = col
+		self.history[piece][col] += depth*depth
+
+
+# The game's searcher, its table lives for the whole game
+searcher = Searcher()
+
+def minimax(board, depth, alpha, beta, maximizingPlayer):
+	return searcher.minimax(board, depth, alpha, beta, maximizingPlayer)
+
+
+
+# Parallel root search
+# The first root move is searched on its own to get a score to beat, then the other root moves are searched at the
+# same time in the pool with the window (best score so far, inf). A move that comes back above that window has an exact
+# score, so picking the first move with the highest exact score gives the same move and value as Searcher(ordering).search
+# Returns (column, value, nodes), nodes counts the root and every node the pool processes searched, same as Searcher.nodes
+def parallel_search(board, depth, executor, ordering=MOVE_ORDERING):
+	if ordering:
+		# What a fresh Searcher tries first at the root: center first
+		moves = [col for col in board.config.center_order if board.heights[col] < board.config.rows]
+	else:
+		moves = get_valid_locations(board)
+
+	column = moves[0]
+	value, nodes = executor.submit(search_root_move, board, column, depth, -math.inf, ordering).result()
+	nodes += 1
+	# Nothing beats a win
+	if value >= AI_WIN_SCORE:
+		return column, value, nodes
+
+	alpha = value
+	futures = [executor.submit(search_root_move, board, col, depth, alpha, ordering) for col in moves[1:]]
+	for col, future in zip(moves[1:], futures):
+		new_score, move_nodes = future.result()
+		nodes += move_nodes
+		if new_score > value:
+			value = new_score
+			column = col
+
+	return column, value, nodes
+
+
+# Searchers kept by pool processes between calls, one per board config
+pool_searchers = {}
+
+def pool_searcher(config):
+	if config not in pool_searchers:
+		pool_searchers[config] = Searcher(config=config)
+	return pool_searchers[config]
+
+
+# (score, nodes searched) of the AI playing col, searched to depth with alpha as the score to beat
+# Runs inside the pool processes
+def search_root_move(board, col, depth, alpha, ordering=MOVE_ORDERING):
+	root_searcher = pool_searcher(board.config)
+	root_searcher.ordering = ordering
+	# Deeper results left over from an earlier call would make the score differ from a fresh serial search
+	root_searcher.new_game()
+	root_searcher.new_search()
+	root_searcher.deadline = None
+	root_searcher.can_stop = True
+	root_searcher.nodes = 0
+	row = get_next_open_row(board, col)
+	drop_piece(board, row, col, AI_PIECE)
+	try:
+		return root_searcher.minimax(board, depth-1, alpha, math.inf, False)[1], root_searcher.nodes
+	finally:
+		undo_piece(board, row, col, AI_PIECE)
+
+
+# One process per core, the caller should shut it down (or use it in a with block) when done
+def create_search_pool(workers=None):
+	if workers is None:
+		workers = os.cpu_count()
+	return concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+
+
+# Runs the searcher on a background thread so the game loop keeps drawing and handling events while the AI thinks
+class AIWorker:
+	# book is anything with a lookup(board) method returning (column, score) or None, like book.OpeningBook
+	def __init__(self, searcher, book=None):
+		self.searcher = searcher
+		self.book = book
+		self.thread = None
+		# (column, value, depth, nodes) once the search is done
+		self.result = None
+		# Column we guessed the player will play while pondering, None when not pondering
+		self.ponder_col = None
+		self.ponder_start = None
+
+	def start(self, board, time_budget_ms):
+		self.cancel()
+		self.ponder_col = None
+		# Book moves are ready straight away, no thread needed
+		if self.book is not None:
+			entry = self.book.lookup(board)
+			if entry is not None:
+				self.result = (entry[0], entry[1], 0, 0)
+				return
+		# The search plays moves on its board, so it gets its own copy
+		self.thread = threading.Thread(target=self.run, args=(board.copy(), time_budget_ms), daemon=True)
+		self.thread.start()
+
+	# Think about the reply to predicted_col while the player is still deciding
+	def ponder(self, board, predicted_col):
+		self.cancel()
+		ponder_board = board.copy()
+		drop_piece(ponder_board, get_next_open_row(ponder_board, predicted_col), predicted_col, PLAYER_PIECE)
+		if is_terminal_node(ponder_board):
+			return
+		# The answer will come from the book
+		if self.book is not None and self.book.lookup(ponder_board) is not None:
+			return
+		self.ponder_col = predicted_col
+		self.ponder_start = time.perf_counter()
+		self.searcher.ponder_deadline = None
+		# No time budget, it runs until the player moves
+		self.thread = threading.Thread(target=self.run, args=(ponder_board, None), daemon=True)
+		self.thread.start()
+
+	# The player played the predicted move: the ponder search becomes the real one
+	# Time spent pondering counts towards the budget so a slow player gets an instant answer
+	def ponder_hit(self, time_budget_ms):
+		self.searcher.ponder_deadline = self.ponder_start + time_budget_ms/1000
+		self.ponder_col = None
+
+	def run(self, board, time_budget_ms):
+		self.searcher.nodes = 0
+		col, value, depth = self.searcher.think(board, time_budget_ms)
+		if not self.searcher.stop_requested:
+			self.result = (col, value, depth, self.searcher.nodes)
+
+	def cancel(self):
+		if self.thread is not None:
+			self.searcher.stop_requested = True
+			self.thread.join()
+			self.searcher.stop_requested = False
+		self.searcher.ponder_deadline = None
+		self.thread = None
+		self.result = None
+		self.ponder_col = None
+
+	# Result of the search if it has finished, otherwise None
+	def poll(self):
+		if self.ponder_col is None and (self.thread is None or not self.thread.is_alive()):
+			return self.result
+		return None
+
+
+
+# valid_locations is a LIST
+# get_valid_location is a FUNCTION
+# is_valid_location is a FUNCITON
+
+def get_valid_locations(board):
+	valid_locations = []
+	rows = board.config.rows
+	for col in range(board.config.columns):
+		if board.heights[col] < rows:
+			valid_locations.append(col)
+	return valid_locations
+
+def pick_best_move(board, piece):
+	valid_locations = get_valid_locations(board)
+	best_score = -10000
+	# Will drop randomly unless there is opportunity to get 3 or 4 in a row
+	best_col = random.choice(valid_locations)
+
+	for col in valid_locations:
+		row = get_next_open_row(board, col)
+		drop_piece(board, row, col, piece)
+		score = score_position(board, piece)
+		undo_piece(board, row, col, piece)
+		
+		if score > best_score:
+			best_score = score
+			best_col = col
+		
+	return best_col
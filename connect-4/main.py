@@ -1,254 +1,56 @@
-import numpy as np
 import random
 import pygame
 import sys
 import math
 
+from engine import (ROW_COUNT, COLUMN_COUNT, PLAYER_PIECE, AI_PIECE, AIWorker, searcher, create_board, drop_piece,
+	is_valid_location, get_next_open_row, print_board, winning_move)
+from book import open_book
+from solver import EndgameSolver, SOLVER_CACHE_PATH
+from stats import SearchStats
+
 BLUE = (0,0,255)
 BLACK = (0,0,0)
 RED = (255,0,0)
 YELLOW = (255,255,0)
 
-ROW_COUNT = 6
-COLUMN_COUNT = 7
-
 # Whos turn is it
 PLAYER = 0
 AI = 1
 
-# Number corresponding to color
-EMPTY = 0
-PLAYER_PIECE = 1
-AI_PIECE = 2
-
-WINDOW_LENGTH = 4
-
-def create_board():
-	board = np.zeros((ROW_COUNT,COLUMN_COUNT))
-	return board
-
-def drop_piece(board, row, col, piece):
-	board[row][col] = piece
-
-def is_valid_location(board, col):
-	return board[ROW_COUNT-1][col] == 0
+# The AI searches deeper and deeper until this many milliseconds are used up
+AI_TIME_BUDGET_MS = 1500
+# Shortest time the AI takes for a move, so its piece doesnt drop the instant the player's lands
+# This is part of AI_TIME_BUDGET_MS, not added on top of it
+AI_MOVE_DELAY_MS = 500
 
-def get_next_open_row(board, col):
-	for r in range(ROW_COUNT):
-		if board[r][col] == 0:
-			return r
-
-def print_board(board):
-	print(np.flip(board, 0))
-
-def winning_move(board, piece):
-	# Check horizontal locations for win
-	for c in range(COLUMN_COUNT-3):
-		for r in range(ROW_COUNT):
-			if board[r][c] == piece and board[r][c+1] == piece and board[r][c+2] == piece and board[r][c+3] == piece:
-				return True
-
-	# Check vertical locations for win
+# The empty board, blue grid with black holes and the black strip on top, drawn once and blitted from after that
+def make_background():
+	background = pygame.Surface(size).convert()
+	background.fill(BLACK)
 	for c in range(COLUMN_COUNT):
-		for r in range(ROW_COUNT-3):
-			if board[r][c] == piece and board[r+1][c] == piece and board[r+2][c] == piece and board[r+3][c] == piece:
-				return True
-
-	# Check positively sloped diaganols
-	for c in range(COLUMN_COUNT-3):
-		for r in range(ROW_COUNT-3):
-			if board[r][c] == piece and board[r+1][c+1] == piece and board[r+2][c+2] == piece and board[r+3][c+3] == piece:
-				return True
-
-	# Check negatively sloped diaganols
-	for c in range(COLUMN_COUNT-3):
-		for r in range(3, ROW_COUNT):
-			if board[r][c] == piece and board[r-1][c+1] == piece and board[r-2][c+2] == piece and board[r-3][c+3] == piece:
-				return True
-
-
-def eval_window(window, piece):
-	score = 0
-
-	opp_piece = PLAYER_PIECE
-	if piece == PLAYER_PIECE:
-		opp_piece = AI_PIECE
-
-	# If piece in given position would make it 4 in a row, AI gotta drop there.
-	# drop in front of own AI piece to win game or player piece to stop them from winning
-	if window.count(piece) == 4:
-		score += 100
-	elif window.count(piece) == 3 and window.count(EMPTY) == 1:
-		score += 5
-	elif window.count(piece) == 2 and window.count(EMPTY) == 2:
-		score += 2
-
-	# Blocks if player getting 4 in a row
-	if window.count(opp_piece) == 3 and window.count(EMPTY) == 1:
-		score -= 4
-
-	return score
-
-
-def score_position(board, piece):
-
-	score = 0
-
-	# Score center column
-	# [:, COLUMN_COUNT//2] will give us center column (// is floor division)
-	center_array = [int(i) for i in list(board[:, COLUMN_COUNT//2])]
-	center_count = center_array.count(piece)
-	score += center_count * 3
-
-
-	# Score Horizontal
-	# For every row on board you must check the first 4 columns
-	for r in range(ROW_COUNT):
-		row_array = [int(i) for i in list(board[r,:])]
-
-		# Using -3 cuz later u are 4 pieces after the starting piece which will finaly be the 4th, 4+3=7
-		for c in range(COLUMN_COUNT-3):
-			window = row_array[c : c+WINDOW_LENGTH]
-			score += eval_window(window, piece)
+		for r in range(ROW_COUNT):
+			pygame.draw.rect(background, BLUE, (c*SQUARESIZE, r*SQUARESIZE+SQUARESIZE, SQUARESIZE, SQUARESIZE))
+			pygame.draw.circle(background, BLACK, (int(c*SQUARESIZE+SQUARESIZE/2), int(r*SQUARESIZE+SQUARESIZE+SQUARESIZE/2)), RADIUS)
+	return background
 
-	# Score Vertical
-	for c in range(COLUMN_COUNT):
-		col_array = [int(i) for i in list(board[:,c])]
-		# Using -3 cuz later u are 4 pieces after the starting piece which will finaly be the 4th, 4+3=7
-		for r in range(ROW_COUNT-3):
-			window = col_array[r:r+WINDOW_LENGTH]
-			score += eval_window(window, piece)
-
-	# Score Positive Slope Diagonal
-	# Window list start point iterates thru 4 rows
-	for r in range(ROW_COUNT-3):
-		# For every row, window list start point iterates thru 4 of the columns
-		for c in range(COLUMN_COUNT-3):
-			# Gets array of positively diagonal pieces for one of the many starting points iterating in the above loop
-			window = [board[r+i][c+i] for i in range(WINDOW_LENGTH)]
-			score += eval_window(window, piece)
-
-	# Score Negative Slope Diagonal
-	for r in range(ROW_COUNT-3):
-		for c in range(COLUMN_COUNT-3):
-			window = [board[r+3-i][c+i] for i in range(WINDOW_LENGTH)] # WINDOW_LENGTH = 4
-			score += eval_window(window, piece)
-
-	# Score Negative Slope Diagonal
-
-	return score
-
-
-def is_terminal_node(board):
-    return winning_move(board, PLAYER_PIECE) or winning_move(board, AI_PIECE) or len(get_valid_locations(board)) == 0
-    
-
-def minimax(board, depth, alpha, beta, maximizingPlayer):
-    valid_locations = get_valid_locations(board)
-    is_terminal = is_terminal_node(board)
-    if depth == 0 or is_terminal:
-        if is_terminal:
-            if winning_move(board, AI_PIECE):
-                return (None, 100000000000000)
-            elif winning_move(board, PLAYER_PIECE):
-                return (None, -10000000000000)
-            else: # Game is over, no more valid moves
-                return (None, 0)
-        else: # Depth is 0
-            return (None, score_position(board, AI_PIECE))
-
-    if maximizingPlayer: # AI
-        value = -math.inf
-        # Random initialization
-        column = random.choice(valid_locations)
-        for col in valid_locations:
-            row = get_next_open_row(board, col)
-            b_copy = board.copy()
-            drop_piece(b_copy, row, col, AI_PIECE)
-            # maximizingPlayer == False so 
-            new_score = minimax(b_copy, depth-1, alpha, beta, False)[1]
-            if new_score > value:
-                value = new_score
-                column = col
-
-            alpha = max(alpha, value)
-            if alpha >= beta:
-                break
-
-        return column, value
-
-
-    else: # Minimizing player / HUMAN PLAYER
-        value = math.inf
-        column = random.choice(valid_locations)
-        for col in valid_locations:
-            row = get_next_open_row(board, col)
-            b_copy = board.copy()
-            drop_piece(b_copy, row, col, PLAYER_PIECE)
-            new_score = minimax(b_copy, depth-1, alpha, beta, True)[1]
-            if new_score < value:
-                value = new_score
-                column = col
-
-            beta = min(beta, value)
-            if alpha >= beta:
-                break
-
-        return column, value
-
-
-
-# valid_locations is a LIST
-# get_valid_location is a FUNCTION
-# is_valid_location is a FUNCITON
-
-def get_valid_locations(board):
-	valid_locations = []
-	for col in range(COLUMN_COUNT):
-		if is_valid_location(board, col):
-			valid_locations.append(col)
-	return valid_locations
-
-def pick_best_move(board, piece):
-	valid_locations = get_valid_locations(board)
-	best_score = -10000
-	# Will drop randomly unless there is opportunity to get 3 or 4 in a row
-	best_col = random.choice(valid_locations)
-
-	for col in valid_locations:
-		row = get_next_open_row(board, col)
-		temp_board = board.copy()
-		drop_piece(temp_board, row, col, piece)
-		score = score_position(temp_board, piece)
-		
-		if score > best_score:
-			best_score = score
-			best_col = col
-		
-	return best_col
-
-
-def draw_board(board):
+def draw_board(screen, background, board):
+	screen.blit(background, (0,0))
 	for c in range(COLUMN_COUNT):
 		for r in range(ROW_COUNT):
-			pygame.draw.rect(screen, BLUE, (c*SQUARESIZE, r*SQUARESIZE+SQUARESIZE, SQUARESIZE, SQUARESIZE))
-			pygame.draw.circle(screen, BLACK, (int(c*SQUARESIZE+SQUARESIZE/2), int(r*SQUARESIZE+SQUARESIZE+SQUARESIZE/2)), RADIUS)
-	
-	for c in range(COLUMN_COUNT):
-		for r in range(ROW_COUNT):		
-			if board[r][c] == PLAYER_PIECE:
-				pygame.draw.circle(screen, RED, (int(c*SQUARESIZE+SQUARESIZE/2), height-int(r*SQUARESIZE+SQUARESIZE/2)), RADIUS)
-			elif board[r][c] == AI_PIECE: 
-				pygame.draw.circle(screen, YELLOW, (int(c*SQUARESIZE+SQUARESIZE/2), height-int(r*SQUARESIZE+SQUARESIZE/2)), RADIUS)
-	pygame.display.update()
-
-
-board = create_board()
-print_board(board)
-game_over = False
+			draw_cell(screen, background, board, r, c)
 
+# Redraws one cell and returns its rect for pygame.display.update
+def draw_cell(screen, background, board, r, c):
+	rect = pygame.Rect(c*SQUARESIZE, height-(r+1)*SQUARESIZE, SQUARESIZE, SQUARESIZE)
+	screen.blit(background, rect, rect)
+	piece = board.get(r, c)
+	if piece == PLAYER_PIECE:
+		pygame.draw.circle(screen, RED, (int(c*SQUARESIZE+SQUARESIZE/2), height-int(r*SQUARESIZE+SQUARESIZE/2)), RADIUS)
+	elif piece == AI_PIECE:
+		pygame.draw.circle(screen, YELLOW, (int(c*SQUARESIZE+SQUARESIZE/2), height-int(r*SQUARESIZE+SQUARESIZE/2)), RADIUS)
+	return rect
 
-pygame.init()
 
 SQUARESIZE = 100
 
@@ -259,84 +61,171 @@ size = (width, height)
 
 RADIUS = int(SQUARESIZE/2 - 5)
 
-screen = pygame.display.set_mode(size)
-draw_board(board)
-pygame.display.update()
-
-myfont = pygame.font.SysFont("monospace", 75)
+# Strip above the board where the player's next piece follows the mouse
+STRIP = pygame.Rect(0, 0, width, SQUARESIZE)
 
-turn = random.randint(PLAYER, AI)
+FPS = 60
 
-while not game_over:
+# Let the AI think about its next move while the player is thinking about theirs
+AI_PONDER = True
 
-	for event in pygame.event.get():
-		if event.type == pygame.QUIT:
-			sys.exit()
+# Set to a file name to log every AI search there as JSON lines (see stats.py)
+SEARCH_STATS_PATH = None
 
-		if event.type == pygame.MOUSEMOTION:
-			pygame.draw.rect(screen, BLACK, (0,0, width, SQUARESIZE))
-			posx = event.pos[0]
-			if turn == PLAYER:
-				pygame.draw.circle(screen, RED, (posx, int(SQUARESIZE/2)), RADIUS)
 
-		pygame.display.update()
+def main():
+	pygame.init()
 
-		if event.type == pygame.MOUSEBUTTONDOWN:
-			pygame.draw.rect(screen, BLACK, (0,0, width, SQUARESIZE))
-			#print(event.pos)
-			# Ask for Player 1 Input
-			if turn == PLAYER:
-				posx = event.pos[0]
-				col = int(math.floor(posx/SQUARESIZE))
+	board = create_board()
+	searcher.new_game()
+	# Last moves get solved exactly, solved positions are saved between games
+	searcher.solver = EndgameSolver(SOLVER_CACHE_PATH)
+	if SEARCH_STATS_PATH is not None:
+		searcher.stats = SearchStats(SEARCH_STATS_PATH)
+	# Opening moves come from the book when it has been generated (python book.py)
+	worker = AIWorker(searcher, open_book())
+	print_board(board)
+	game_over = False
+	game_over_time = None
 
-				if is_valid_location(board, col):
-					row = get_next_open_row(board, col)
-					drop_piece(board, row, col, PLAYER_PIECE)
-
-					if winning_move(board, PLAYER_PIECE):
-						label = myfont.render("Player 1 wins!!", 1, RED)
-						screen.blit(label, (40,10))
-						game_over = True
-
-					turn += 1
-					turn = turn % 2
-
-					print_board(board)
-					draw_board(board)
-
-
-
-	# Ask for Player 2 Input
-	if turn == AI and not game_over:	
-
-		# col = random.randint(0, COLUMN_COUNT - 1)
-		# col = pick_best_move(board, AI_PIECE)
-
-        # First Call to minimax algo
-		# Initializes alpha and beta as -inf and inf
-		col, minimax_score = minimax(board, 5, -math.inf, math.inf , True)
-
-		if is_valid_location(board, col):
+	screen = pygame.display.set_mode(size)
+	background = make_background()
+	draw_board(screen, background, board)
+	pygame.display.update()
 
-			# Delay Before AI drops piece
-			pygame.time.wait(500)
+	myfont = pygame.font.SysFont("monospace", 75)
+	clock = pygame.time.Clock()
 
-			row = get_next_open_row(board, col)
-			drop_piece(board, row, col, AI_PIECE)
+	turn = random.randint(PLAYER, AI)
+	# When the AI started on its current move, None if it hasnt been asked yet
+	think_start = None
 
-			if winning_move(board, AI_PIECE):
-				label = myfont.render("Player 2 wins!!", 1, YELLOW)
-				screen.blit(label, (40,10))
-				game_over = True
+	while True:
+		clock.tick(FPS)
+		# Parts of the screen drawn on this frame, only these get sent to the display
+		dirty = []
 
-			print_board(board)
-			draw_board(board)
+		for event in pygame.event.get():
+			if event.type == pygame.QUIT:
+				worker.cancel()
+				searcher.solver.close()
+				if searcher.stats is not None:
+					searcher.stats.close()
+				sys.exit()
 
-			turn += 1
-			turn = turn % 2
+			if game_over:
+				continue
 
-	if game_over:
-		pygame.time.wait(3000)
+			if event.type == pygame.MOUSEMOTION:
+				pygame.draw.rect(screen, BLACK, STRIP)
+				posx = event.pos[0]
+				if turn == PLAYER:
+					pygame.draw.circle(screen, RED, (posx, int(SQUARESIZE/2)), RADIUS)
+				if STRIP not in dirty:
+					dirty.append(STRIP)
+
+			if event.type == pygame.MOUSEBUTTONDOWN:
+				pygame.draw.rect(screen, BLACK, STRIP)
+				if STRIP not in dirty:
+					dirty.append(STRIP)
+				#print(event.pos)
+				# Ask for Player 1 Input
+				if turn == PLAYER:
+					posx = event.pos[0]
+					col = int(math.floor(posx/SQUARESIZE))
+
+					if is_valid_location(board, col):
+						row = get_next_open_row(board, col)
+						drop_piece(board, row, col, PLAYER_PIECE)
+
+						if winning_move(board, PLAYER_PIECE):
+							label = myfont.render("Player 1 wins!!", 1, RED)
+							dirty.append(screen.blit(label, (40,10)))
+							game_over = True
+							worker.cancel()
+						elif board.moves == board.config.cells:
+							label = myfont.render("Draw!!", 1, BLUE)
+							dirty.append(screen.blit(label, (40,10)))
+							game_over = True
+							worker.cancel()
+
+						turn += 1
+						turn = turn % 2
+
+						print_board(board)
+						dirty.append(draw_cell(screen, background, board, row, col))
+
+						if not game_over:
+							think_start = pygame.time.get_ticks()
+							# If the AI guessed this move it already has a head start on the answer
+							if worker.ponder_col == col:
+								worker.ponder_hit(AI_TIME_BUDGET_MS)
+							else:
+								worker.start(board, AI_TIME_BUDGET_MS)
+
+
+		# Ask for Player 2 Input
+		if turn == AI and not game_over:
+
+			# col = random.randint(0, COLUMN_COUNT - 1)
+			# col = pick_best_move(board, AI_PIECE)
+
+			# AI goes first, nothing to ponder on yet
+			if think_start is None:
+				think_start = pygame.time.get_ticks()
+				worker.start(board, AI_TIME_BUDGET_MS)
+
+			result = worker.poll()
+			# Delay Before AI drops piece, the time spent thinking already counts towards it
+			if result is not None and pygame.time.get_ticks() - think_start >= AI_MOVE_DELAY_MS:
+				col, minimax_score, depth_reached, nodes = result
+				if depth_reached == 0:
+					print("AI played a book move")
+				else:
+					print(f"AI searched {nodes} nodes, depth {depth_reached}")
+
+				row = get_next_open_row(board, col)
+				drop_piece(board, row, col, AI_PIECE)
+
+				if winning_move(board, AI_PIECE):
+					label = myfont.render("Player 2 wins!!", 1, YELLOW)
+					dirty.append(screen.blit(label, (40,10)))
+					game_over = True
+				elif board.moves == board.config.cells:
+					label = myfont.render("Draw!!", 1, BLUE)
+					dirty.append(screen.blit(label, (40,10)))
+					game_over = True
+
+				print_board(board)
+				dirty.append(draw_cell(screen, background, board, row, col))
+
+				turn += 1
+				turn = turn % 2
+
+				# The table's best move for the player here is what the AI expects them to play
+				entry = searcher.table.lookup(board.hash)
+				if AI_PONDER and not game_over and entry is not None:
+					worker.ponder(board, entry[4])
+				else:
+					worker.cancel()
+
+		if dirty:
+			pygame.display.update(dirty)
+
+		if game_over:
+			if game_over_time is None:
+				game_over_time = pygame.time.get_ticks()
+			elif pygame.time.get_ticks() - game_over_time >= 3000:
+				break
+
+	worker.cancel()
+	searcher.solver.close()
+	if searcher.stats is not None:
+		searcher.stats.close()
+
+
+if __name__ == "__main__":
+	main()
 
 
 # CODE PROBLEMS
@@ -0,0 +1,189 @@
+# Self play and benchmark runner for the Connect 4 engine
+# Plays seeded games between two agents and reports speed, search depth and win rates, for example
+#   python selfplay.py minimax:5 greedy --games 20 --seed 1
+#   python selfplay.py think:200 greedy --rows 8 --columns 9 --connect 5
+#   python selfplay.py think:200 think:200 --solver
+#   python selfplay.py think:200 minimax:5 --stats stats.jsonl
+#   python selfplay.py parallel:7 minimax:7 --workers 4
+#
+# Agents:
+#   random        random valid column
+#   greedy        pick_best_move, best score_position one move ahead
+#   minimax:D     minimax searched to depth D
+#   think:MS      iterative deepening with MS milliseconds per move (what the game uses)
+#   parallel:D    minimax to depth D with the root moves searched at the same time in a process pool (parallel_search)
+import argparse
+import json
+import random
+import time
+
+from engine import (ROW_COUNT, COLUMN_COUNT, WINDOW_LENGTH, PLAYER_PIECE, AI_PIECE, Searcher, board_config, create_board,
+	drop_piece, get_next_open_row, get_valid_locations, winning_move, pick_best_move, parallel_search, create_search_pool)
+from solver import EndgameSolver
+from stats import SearchStats
+
+
+class Agent:
+	KINDS = ("random", "greedy", "minimax", "think", "parallel")
+
+	# solver makes think agents solve the last moves exactly (see solver.py)
+	# stats is a function given each search's statistics (see stats.py), None to not collect them
+	# workers is how many processes a parallel agent searches with, None for one per core
+	def __init__(self, spec, config, solver=False, stats=None, workers=None):
+		self.spec = spec
+		kind, _, arg = spec.partition(":")
+		if kind not in self.KINDS or (kind in ("minimax", "think", "parallel")) != bool(arg):
+			raise ValueError(f"Unknown agent {spec!r}, expected random, greedy, minimax:DEPTH, think:MS or parallel:DEPTH")
+		self.kind = kind
+		self.arg = int(arg) if arg else None
+		self.searcher = Searcher(config=config) if kind in ("minimax", "think") else None
+		if solver and kind == "think":
+			self.searcher.solver = EndgameSolver()
+		if stats is not None and self.searcher is not None:
+			self.searcher.stats = SearchStats(lambda record: stats(dict(record, agent=spec)))
+		self.pool = create_search_pool(workers) if kind == "parallel" else None
+
+		self.moves = 0
+		self.seconds = 0.0
+		self.nodes = 0
+		self.depth_total = 0
+		self.max_depth = 0
+
+	def new_game(self):
+		if self.searcher is not None:
+			self.searcher.new_game()
+
+	def close(self):
+		if self.pool is not None:
+			self.pool.shutdown()
+
+	def choose(self, board, piece, rng):
+		start = time.perf_counter()
+		depth = 1
+		if self.kind == "random":
+			col = rng.choice(get_valid_locations(board))
+		elif self.kind == "greedy":
+			col = pick_best_move(board, piece)
+		else:
+			# The engine always searches for AI_PIECE, so the player's side sees the board with colors swapped
+			search_board = board if piece == AI_PIECE else board.swapped()
+			if self.kind == "parallel":
+				col, value, nodes = parallel_search(search_board, self.arg, self.pool)
+				depth = self.arg
+				self.nodes += nodes
+			else:
+				self.searcher.nodes = 0
+				if self.kind == "minimax":
+					col, value = self.searcher.search(search_board, self.arg)
+					depth = self.arg
+				else:
+					col, value, depth = self.searcher.think(search_board, self.arg)
+				self.nodes += self.searcher.nodes
+
+		self.seconds += time.perf_counter() - start
+		self.moves += 1
+		self.depth_total += depth
+		self.max_depth = max(self.max_depth, depth)
+		return col
+
+	def report(self):
+		return {
+			"agent": self.spec,
+			"moves": self.moves,
+			"ms_per_move": 1000 * self.seconds / max(self.moves, 1),
+			"nodes": self.nodes,
+			"nodes_per_sec": self.nodes / self.seconds if self.seconds else 0.0,
+			"avg_depth": self.depth_total / max(self.moves, 1),
+			"max_depth": self.max_depth,
+		}
+
+
+# Plays one game, agents[0] moves first. Returns 0 or 1 for the winning agent, None for a draw
+def play_game(agents, rng, random_opening=0, config=None):
+	board = create_board(config or board_config())
+	for agent in agents:
+		agent.new_game()
+
+	pieces = (PLAYER_PIECE, AI_PIECE)
+	for ply in range(board.config.cells):
+		turn = ply % 2
+		piece = pieces[turn]
+		# A few random moves first so two deterministic agents dont play the same game every time
+		if ply < random_opening:
+			col = rng.choice(get_valid_locations(board))
+		else:
+			col = agents[turn].choose(board, piece, rng)
+		drop_piece(board, get_next_open_row(board, col), col, piece)
+		if winning_move(board, piece):
+			return turn
+	return None
+
+
+def run(specs, games, seed, random_opening=0, config=None, solver=False, stats=None, workers=None):
+	config = config or board_config()
+	agents = [Agent(spec, config, solver, stats, workers) for spec in specs]
+	wins = [0, 0]
+	draws = 0
+	start = time.perf_counter()
+	try:
+		for game in range(games):
+			rng = random.Random(seed + game)
+			# pick_best_move uses the random module directly
+			random.seed(seed + game)
+			# Take turns going first
+			order = (0, 1) if game % 2 == 0 else (1, 0)
+			winner = play_game([agents[i] for i in order], rng, random_opening, config)
+			if winner is None:
+				draws += 1
+			else:
+				wins[order[winner]] += 1
+	finally:
+		for agent in agents:
+			agent.close()
+
+	return {
+		"board": f"{config.rows}x{config.columns} connect {config.connect}",
+		"games": games,
+		"seed": seed,
+		"random_opening": random_opening,
+		"solver": solver,
+		"seconds": time.perf_counter() - start,
+		"draws": draws,
+		"agents": [dict(agent.report(), wins=wins[i], win_rate=wins[i] / games) for i, agent in enumerate(agents)],
+	}
+
+
+def print_report(report):
+	print(f"{report['board']}, {report['games']} games, seed {report['seed']}, {report['random_opening']} random opening moves, "
+		f"{report['seconds']:.1f}s, {report['draws']} draws")
+	print(f"{'agent':<14}{'win rate':>9}{'ms/move':>10}{'nodes/s':>11}{'avg depth':>11}{'max depth':>11}")
+	for agent in report["agents"]:
+		print(f"{agent['agent']:<14}{agent['win_rate']:>9.2f}{agent['ms_per_move']:>10.1f}{agent['nodes_per_sec']:>11.0f}"
+			f"{agent['avg_depth']:>11.1f}{agent['max_depth']:>11}")
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Play Connect 4 agents against each other and benchmark the search")
+	parser.add_argument("agents", nargs=2, help="random, greedy, minimax:DEPTH, think:MS or parallel:DEPTH")
+	parser.add_argument("--games", type=int, default=10)
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--random-opening", type=int, default=2, help="random moves played before the agents take over")
+	parser.add_argument("--rows", type=int, default=ROW_COUNT)
+	parser.add_argument("--columns", type=int, default=COLUMN_COUNT)
+	parser.add_argument("--connect", type=int, default=WINDOW_LENGTH)
+	parser.add_argument("--solver", action="store_true", help="think agents solve the endgame exactly")
+	parser.add_argument("--workers", type=int, help="processes each parallel agent searches with (default one per core)")
+	parser.add_argument("--stats", help="write every search's node counts, cutoffs and timings to this file as JSON lines")
+	parser.add_argument("--json", help="also write the report to this file")
+	args = parser.parse_args()
+
+	config = board_config(args.rows, args.columns, args.connect)
+	stats_file = SearchStats(args.stats) if args.stats else None
+	report = run(args.agents, args.games, args.seed, args.random_opening, config, args.solver,
+		stats_file.sink if stats_file else None, args.workers)
+	print_report(report)
+	if stats_file:
+		stats_file.close()
+	if args.json:
+		with open(args.json, "w") as f:
+			json.dump(report, f, indent=2)
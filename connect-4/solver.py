@@ -0,0 +1,163 @@
+# Exact endgame solver for the Connect 4 AI
+# Once few enough cells are empty the game can be searched to the end, so instead of score_position guesses
+# the AI gets the real result: win, loss or draw and how fast. Scores are from the side to move's point of view:
+#   positive  side to move wins, the sooner the win the bigger (half the cells left empty after the winning piece, plus 1)
+#   0         draw
+#   negative  side to move loses, the later the loss the closer to 0
+# Negamax with null window searches narrows the score down by bisection, each search only answers "is it above x".
+# Solved positions go into a shelve file on disk so the next game doesnt solve them again.
+import os
+import shelve
+
+from engine import SearchTimeout, drop_piece, undo_piece
+
+# Solve once this many cells or fewer are left empty
+# At 20 the slowest solves measured took about a quarter of a second, at 24 they took several seconds
+SOLVER_EMPTY_CELLS = 20
+
+# Where the game keeps solved positions between games
+SOLVER_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solved_positions")
+
+
+class EndgameSolver:
+	# How many nodes to visit between calls to should_stop
+	CHECK_INTERVAL = 1024
+	# Upper bounds kept in memory, the table is emptied when it grows past this
+	MAX_TABLE_SIZE = 1 << 20
+
+	# cache_path is the shelve file for solved positions, None keeps them in memory only
+	def __init__(self, cache_path=None, max_empty=SOLVER_EMPTY_CELLS):
+		self.max_empty = max_empty
+		self.cache = shelve.open(cache_path) if cache_path is not None else {}
+		# (hash, piece to move) -> upper bound on the score, true whatever window the position was searched with
+		self.upper_bounds = {}
+		self.nodes = 0
+		self.should_stop = None
+
+	def close(self):
+		if isinstance(self.cache, shelve.Shelf):
+			self.cache.close()
+
+	# A full board has no move to find
+	def can_solve(self, board):
+		return 0 < board.config.cells - board.moves <= self.max_empty
+
+	# The same pieces can have either side to move depending on who went first, so the key has both
+	def cache_key(self, board, piece):
+		config = board.config
+		return f"{config.rows}x{config.columns}x{config.connect}:{piece}:{board.hash:016x}"
+
+	# Best (column, score) for piece to play
+	# should_stop is called every so often and the solve gives up with SearchTimeout when it returns True
+	def best_move(self, board, piece, should_stop=None):
+		self.should_stop = should_stop
+		opp_piece = 3 - piece
+		best_col = None
+		best_score = None
+		for col in board.config.center_order:
+			row = board.heights[col]
+			if row >= board.config.rows:
+				continue
+			drop_piece(board, row, col, piece)
+			try:
+				if board.fours[piece]:
+					score = (board.config.cells - board.moves) // 2 + 1
+				else:
+					score = -self.solve(board, opp_piece)
+			finally:
+				undo_piece(board, row, col, piece)
+			if best_score is None or score > best_score:
+				best_col = col
+				best_score = score
+		if isinstance(self.cache, shelve.Shelf):
+			self.cache.sync()
+		return best_col, best_score
+
+	# Exact score of the position for piece, the side to move
+	def solve(self, board, piece):
+		key = self.cache_key(board, piece)
+		if key in self.cache:
+			return self.cache[key]
+
+		empty = board.config.cells - board.moves
+		low = -(empty // 2)
+		high = (empty + 1) // 2
+		# Bisect the score range with null window searches, leaning towards 0 because draws and slow wins are the most common
+		while low < high:
+			mid = low + (high - low) // 2
+			if mid <= 0 and low // 2 < mid:
+				mid = low // 2
+			elif mid >= 0 and high // 2 > mid:
+				mid = high // 2
+			result = self.negamax(board, piece, mid, mid + 1)
+			if result <= mid:
+				high = result
+			else:
+				low = result
+
+		self.cache[key] = low
+		return low
+
+	def negamax(self, board, piece, alpha, beta):
+		self.nodes += 1
+		if self.should_stop is not None and self.nodes % self.CHECK_INTERVAL == 0 and self.should_stop():
+			raise SearchTimeout()
+
+		config = board.config
+		if board.moves == config.cells:
+			return 0
+
+		moves = self.ordered_moves(board, piece)
+		# ordered_moves puts a winning move first
+		if moves[0] is None:
+			return (config.cells - board.moves - 1) // 2 + 1
+
+		# Cant win this move so the best possible is winning with our next piece
+		best_possible = (config.cells - board.moves - 1) // 2
+		key = (board.hash, piece)
+		upper_bound = self.upper_bounds.get(key)
+		if upper_bound is not None and upper_bound < best_possible:
+			best_possible = upper_bound
+		if beta > best_possible:
+			beta = best_possible
+			if alpha >= beta:
+				return beta
+
+		opp_piece = 3 - piece
+		for col in moves:
+			row = board.heights[col]
+			drop_piece(board, row, col, piece)
+			try:
+				score = -self.negamax(board, opp_piece, -beta, -alpha)
+			finally:
+				undo_piece(board, row, col, piece)
+			if score >= beta:
+				return score
+			if score > alpha:
+				alpha = score
+
+		if len(self.upper_bounds) >= self.MAX_TABLE_SIZE:
+			self.upper_bounds.clear()
+		self.upper_bounds[key] = alpha
+		return alpha
+
+	# Valid columns, the ones that look best for piece (score_position after the move) first, ties center first
+	# Returns [None] if piece can win on the spot
+	def ordered_moves(self, board, piece):
+		config = board.config
+		scores = board.scores
+		opp_piece = 3 - piece
+		scored = []
+		for col in config.center_order:
+			row = board.heights[col]
+			if row < config.rows:
+				drop_piece(board, row, col, piece)
+				won = board.fours[piece]
+				score = scores[piece] - scores[opp_piece]
+				undo_piece(board, row, col, piece)
+				if won:
+					return [None]
+				scored.append((score, col))
+		# sort is stable so equal scores keep the center first order
+		scored.sort(key=lambda move: move[0], reverse=True)
+		return [col for score, col in scored]
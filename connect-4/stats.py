@@ -0,0 +1,87 @@
+# Search statistics for the Connect 4 AI
+# Hook one up to a Searcher (searcher.stats = SearchStats("stats.jsonl")) and every think or search call writes one JSON line:
+#   ply           pieces on the board when the search started
+#   column, value, depth   what the search returned, depth is the deepest one that finished
+#   nodes         minimax calls, leaf_evals is how many of those stopped at depth 0 and used score_position
+#   cutoffs       alpha-beta cutoffs, cutoff_index[i] counts the cutoffs caused by the i-th move tried (0 is the first)
+#   ebf           effective branching factor, nodes ** (1/depth)
+#   depths        per finished depth: nodes, leaf_evals, cutoffs, ms and the branching factor against the depth before
+#   solved        True when the endgame solver answered instead of minimax
+# With searcher.stats left as None the search only pays for an "is None" check at leaves and cutoffs.
+import json
+import time
+
+
+class SearchStats:
+	# sink is a path to append lines to, or a function called with each record (a dict)
+	def __init__(self, sink):
+		if isinstance(sink, str):
+			self.file = open(sink, "a")
+			self.sink = self.write_line
+		else:
+			self.file = None
+			self.sink = sink
+		self.leaf_evals = 0
+		self.cutoff_index = []
+		self.record = None
+
+	def close(self):
+		if self.file is not None:
+			self.file.close()
+
+	def write_line(self, record):
+		self.file.write(json.dumps(record) + "\n")
+		self.file.flush()
+
+	# Called from minimax when move number index (0 based, in search order) caused a cutoff
+	def cutoff(self, index):
+		cutoff_index = self.cutoff_index
+		while len(cutoff_index) <= index:
+			cutoff_index.append(0)
+		cutoff_index[index] += 1
+
+	def start_move(self, searcher, board):
+		self.leaf_evals = 0
+		self.cutoff_index = []
+		self.record = {"ply": board.moves, "start": time.perf_counter(), "nodes": searcher.nodes, "depths": []}
+		self.start_depth(searcher)
+
+	def start_depth(self, searcher):
+		self.depth_start = (time.perf_counter(), searcher.nodes, self.leaf_evals, sum(self.cutoff_index))
+
+	# depth finished, counts are what it took on its own
+	def end_depth(self, searcher, depth):
+		start, nodes, leaf_evals, cutoffs = self.depth_start
+		depths = self.record["depths"]
+		entry = {
+			"depth": depth,
+			"nodes": searcher.nodes - nodes,
+			"leaf_evals": self.leaf_evals - leaf_evals,
+			"cutoffs": sum(self.cutoff_index) - cutoffs,
+			"ms": 1000 * (time.perf_counter() - start),
+		}
+		if depths and depths[-1]["nodes"]:
+			entry["branching"] = entry["nodes"] / depths[-1]["nodes"]
+		depths.append(entry)
+		self.start_depth(searcher)
+
+	def end_move(self, searcher, column, value, depth, solved=False):
+		record = self.record
+		self.record = None
+		nodes = searcher.nodes - record["nodes"]
+		cutoffs = sum(self.cutoff_index)
+		self.sink({
+			"ply": record["ply"],
+			"column": column,
+			"value": value,
+			"depth": depth,
+			"solved": solved,
+			"ms": 1000 * (time.perf_counter() - record["start"]),
+			"nodes": nodes,
+			"leaf_evals": self.leaf_evals,
+			"cutoffs": cutoffs,
+			"cutoff_index": self.cutoff_index,
+			"first_move_cutoff_rate": self.cutoff_index[0] / cutoffs if cutoffs else None,
+			"ebf": nodes ** (1/depth) if depth else None,
+			"depths": record["depths"],
+		})
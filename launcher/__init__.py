@@ -0,0 +1,50 @@
+# Starts either game
+# Importing this doesnt import pygame, NumPy or anything from the games, a game's modules only get imported once its picked
+#
+#   python -m launcher connect-4
+#   python -m launcher space-invaders --seed 3
+#
+# python -m launcher.bench measures how long each game takes to start, see bench.py
+import importlib
+import os
+import sys
+
+# The folder the games are in, found from this file so it doesnt matter where the launcher is started from
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Game name -> its folder
+FOLDERS = {
+    "connect-4": "connect-4",
+    "space-invaders": "space-invaders",
+}
+
+
+# Imports the main module of the game called name and returns it
+# The games import their own modules by name (from engine import ...) so their folder goes on the path first,
+# and since both of them have a main.py only one game can be loaded in a process
+def load(name):
+    path = os.path.join(ROOT, FOLDERS[name])
+    loaded = sys.modules.get("main")
+    if loaded is not None and os.path.dirname(os.path.abspath(loaded.__file__)) != path:
+        raise RuntimeError(f"cant load {name}, another game is already loaded in this process")
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return importlib.import_module("main")
+
+
+def connect_four(argv=()):
+    if argv:
+        raise SystemExit("connect-4 doesnt take any arguments")
+    load("connect-4").main()
+
+
+# argv is the same arguments space-invaders/main.py takes (--headless, --seed and so on)
+def space_invaders(argv=()):
+    load("space-invaders").run(list(argv))
+
+
+# Game name -> function that starts it with a list of command line arguments
+GAMES = {
+    "connect-4": connect_four,
+    "space-invaders": space_invaders,
+}
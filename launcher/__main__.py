@@ -0,0 +1,8 @@
+import sys
+
+from launcher import GAMES
+
+if len(sys.argv) < 2 or sys.argv[1] not in GAMES:
+    print(f"usage: python -m launcher {{{','.join(GAMES)}}} [game arguments]")
+    sys.exit(2)
+GAMES[sys.argv[1]](sys.argv[2:])
@@ -0,0 +1,117 @@
+# Startup benchmark for both games
+# Starts each game in a new Python process a few times and reports the median of:
+#   import       how long loading the game's modules took (pygame, NumPy and everything else they import)
+#   first frame  from starting the process to the game sending its first frame to the display
+#   peak RSS     the most memory the process had used by then
+# and which of pygame and NumPy were already imported before a game was picked (there should be none)
+#
+#   python -m launcher.bench [--runs 5] [--window] [--budget-ms 1000]
+#
+# Without --window the games draw to SDL's dummy video driver so it works on machines with no screen too.
+# With --budget-ms it exits with an error when a game's first frame takes longer, to catch startup getting slower.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import launcher
+
+# Modules that should only get imported once a game is picked
+HEAVY_MODULES = ("pygame", "numpy")
+
+
+# Most memory this process has used in MB, None where the resource module doesnt exist (Windows)
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux gives kilobytes, macOS bytes
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+# Runs in the new process: starts the game called name and prints the measurements as JSON at its first frame
+def child(name):
+    launched = float(os.environ["LAUNCHER_BENCH_START"])
+    early = [module for module in HEAVY_MODULES if module in sys.modules]
+    start = time.perf_counter()
+    module = launcher.load(name)
+    import_s = time.perf_counter() - start
+    # connect-4 opens its endgame solver's cache before the first frame, it goes in a folder measure deletes after
+    if hasattr(module, "SOLVER_CACHE_PATH"):
+        module.SOLVER_CACHE_PATH = os.path.join(os.environ["LAUNCHER_BENCH_TEMP"], "solved_positions")
+    import pygame
+
+    def first_frame(*args):
+        print(json.dumps({
+            "import_s": import_s,
+            "first_frame_s": time.time() - launched,
+            "peak_rss_mb": peak_rss_mb(),
+            "early": early,
+        }), flush=True)
+        # The games leave threads and processes running (like connect-4's AI), none of them need cleaning up here
+        os._exit(0)
+
+    pygame.display.update = pygame.display.flip = first_frame
+    launcher.GAMES[name]([])
+
+
+# Starts the game called name in a new process and returns its measurements
+def measure(name, window=False):
+    env = dict(os.environ)
+    if not window:
+        env["SDL_VIDEODRIVER"] = "dummy"
+        env["SDL_AUDIODRIVER"] = "dummy"
+    # Anything the game writes goes here instead of next to its code
+    with tempfile.TemporaryDirectory() as temp:
+        env["LAUNCHER_BENCH_TEMP"] = temp
+        env["LAUNCHER_BENCH_START"] = repr(time.time())
+        result = subprocess.run([sys.executable, "-m", "launcher.bench", "--child", name], cwd=launcher.ROOT, env=env,
+            capture_output=True, text=True, timeout=120)
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(f"{name} never drew a frame:\n{result.stderr}")
+
+
+# Median of every measurement over runs starts of the game called name
+def benchmark(name, runs=5, window=False):
+    results = [measure(name, window) for _ in range(runs)]
+    peaks = [result["peak_rss_mb"] for result in results if result["peak_rss_mb"] is not None]
+    return {
+        "import_s": statistics.median(result["import_s"] for result in results),
+        "first_frame_s": statistics.median(result["first_frame_s"] for result in results),
+        "peak_rss_mb": statistics.median(peaks) if peaks else None,
+        "early": sorted({module for result in results for module in result["early"]}),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup benchmark for the games")
+    parser.add_argument("--runs", type=int, default=5, help="times to start each game, the median is reported")
+    parser.add_argument("--game", choices=list(launcher.GAMES), action="append", help="game to measure (default all of them)")
+    parser.add_argument("--window", action="store_true", help="open real windows instead of using the dummy video driver")
+    parser.add_argument("--budget-ms", type=float, help="fail if a game's first frame takes longer than this")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        sys.exit(f"{args.child} exited without drawing a frame")
+
+    failed = False
+    print(f"{'game':<16}{'import':>10}{'first frame':>14}{'peak RSS':>12}   imported before a game was picked")
+    for name in args.game or launcher.GAMES:
+        report = benchmark(name, args.runs, args.window)
+        peak = f"{report['peak_rss_mb']:.1f}MB" if report["peak_rss_mb"] is not None else "n/a"
+        print(f"{name:<16}{report['import_s'] * 1000:>8.1f}ms{report['first_frame_s'] * 1000:>12.1f}ms{peak:>12}   "
+            f"{', '.join(report['early']) or 'nothing'}")
+        if args.budget_ms is not None and report["first_frame_s"] * 1000 > args.budget_ms:
+            failed = True
+    if failed:
+        sys.exit(f"first frame took longer than {args.budget_ms:.0f}ms")
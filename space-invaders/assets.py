@@ -0,0 +1,50 @@
+# Images for the game, loaded the first time something asks for them
+# Once there is a window every image is converted to its pixel format so blitting it doesnt convert every pixel every frame,
+# and each image's hitbox mask is only ever made once no matter how many ships or lasers use it
+import os
+import pygame
+
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+
+class Assets:
+    def __init__(self, directory=ASSET_DIR):
+        self.directory = directory
+        # (name, size, alpha) -> surface, and whether it has been converted to the window's format yet
+        self.images = {}
+        self.converted = {}
+        # (name, size) -> mask
+        self.masks = {}
+
+    # The image in the assets folder called name
+    # size gives a copy scaled to (width, height), made once and kept
+    # alpha=False is for images with no see through parts (like the background), they blit faster
+    def image(self, name, size=None, alpha=True):
+        key = (name, size, alpha)
+        image = self.images.get(key)
+        if image is not None and self.converted[key]:
+            return image
+
+        if image is None:
+            image = pygame.image.load(os.path.join(self.directory, name))
+            if size is not None:
+                image = pygame.transform.scale(image, size)
+        # Converting needs a window, with none (like in the headless mode) the image is kept as loaded until there is one
+        converted = pygame.display.get_surface() is not None
+        if converted:
+            image = image.convert_alpha() if alpha else image.convert()
+        self.images[key] = image
+        self.converted[key] = converted
+        return image
+
+    # Hitbox of the image called name
+    def mask(self, name, size=None):
+        key = (name, size)
+        mask = self.masks.get(key)
+        if mask is None:
+            mask = self.masks[key] = pygame.mask.from_surface(self.image(name, size))
+        return mask
+
+
+# The game's images
+assets = Assets()
@@ -0,0 +1,11 @@
+# Broadphase for collisions
+# Mask overlap tests are slow so before any of them runs we cheaply throw out pairs whose rects dont even touch
+# Anything with x, y and a mask (lasers and ships) can go in here, EntityStore.overlapping does the same test for a whole store at once
+
+
+# If the rects around the two masks overlap, the masks might
+def rects_overlap(object1, object2):
+    width1, height1 = object1.mask.get_size()
+    width2, height2 = object2.mask.get_size()
+    return (object1.x < object2.x + width2 and object2.x < object1.x + width1 and
+            object1.y < object2.y + height2 and object2.y < object1.y + height1)
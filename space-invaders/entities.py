@@ -0,0 +1,179 @@
+# Struct of arrays storage for things there can be thousands of (enemies and their lasers)
+# Instead of one Python object each, every field is a NumPy array with one slot per entity,
+# so moving them, ticking cooldowns and finding the ones off screen is one array operation per frame
+import numpy as np
+
+from assets import assets
+
+
+class EntityStore:
+    # Every per entity array, grown together when the store fills up
+    FIELDS = {
+        "alive": bool,
+        "x": float,
+        "y": float,
+        "vx": float,
+        "vy": float,
+        # Where it was before the last move, drawing goes between the two
+        "last_x": float,
+        "last_y": float,
+        "cooldown": np.int32,
+        "health": np.int32,
+        "image": np.int32,
+        # Different for every entity ever spawned, so something holding on to a slot can tell if its been reused since
+        "id": np.int64,
+    }
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        for name, dtype in self.FIELDS.items():
+            setattr(self, name, np.zeros(capacity, dtype))
+        # Slots at size and past it have never been used, free holds the ones that were and are empty again
+        self.size = 0
+        self.free = []
+        self.next_id = 0
+        # Entities store an image id, these are looked up by it
+        self.image_names = []
+        self.masks = []
+        self.widths = np.zeros(0, np.int32)
+        self.heights = np.zeros(0, np.int32)
+        self.image_ids = {}
+
+    def __len__(self):
+        return self.size - len(self.free)
+
+    # Id for the image called name in assets, added the first time its seen
+    def image_id(self, name):
+        index = self.image_ids.get(name)
+        if index is None:
+            index = self.image_ids[name] = len(self.image_names)
+            image = assets.image(name)
+            self.image_names.append(name)
+            self.masks.append(assets.mask(name))
+            self.widths = np.append(self.widths, image.get_width())
+            self.heights = np.append(self.heights, image.get_height())
+        return index
+
+    def grow(self):
+        self.capacity *= 2
+        for name in self.FIELDS:
+            old = getattr(self, name)
+            new = np.zeros(self.capacity, old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    # Puts a new entity showing the image called image in an empty slot and returns the slot
+    def spawn(self, x, y, image, vx=0, vy=0, health=100):
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.size == self.capacity:
+                self.grow()
+            slot = self.size
+            self.size += 1
+        self.alive[slot] = True
+        self.x[slot] = x
+        self.y[slot] = y
+        self.last_x[slot] = x
+        self.last_y[slot] = y
+        self.vx[slot] = vx
+        self.vy[slot] = vy
+        self.cooldown[slot] = 0
+        self.health[slot] = health
+        self.image[slot] = self.image_id(image)
+        self.id[slot] = self.next_id
+        self.next_id += 1
+        return slot
+
+    # slots can be one slot or an array of them, ones already dead are skipped
+    def kill(self, slots):
+        slots = np.atleast_1d(np.asarray(slots, np.intp))
+        if len(slots) == 0:
+            return
+        slots = slots[self.alive[slots]]
+        self.alive[slots] = False
+        self.free.extend(slots.tolist())
+
+    # True if slot still holds the entity that had id
+    def holds(self, slot, id):
+        return self.alive[slot] and self.id[slot] == id
+
+    # Slots with something in them
+    def live(self):
+        return np.flatnonzero(self.alive[:self.size])
+
+    # Dead slots get moved too, its cheaper than skipping them and they are overwritten when reused
+    def move(self):
+        n = self.size
+        self.last_x[:n] = self.x[:n]
+        self.last_y[:n] = self.y[:n]
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+
+    # Same as Ship.cooldown for every entity at once
+    def tick_cooldowns(self, limit):
+        cooldown = self.cooldown[:self.size]
+        cooldown[:] = np.where(cooldown >= limit, 0, np.where(cooldown > 0, cooldown + 1, 0))
+
+    # Live slots whose rect overlaps the rect at x, y
+    def overlapping(self, x, y, width, height):
+        n = self.size
+        image = self.image[:n]
+        left = self.x[:n]
+        top = self.y[:n]
+        return np.flatnonzero(self.alive[:n] & (left < x + width) & (x < left + self.widths[image]) &
+            (top < y + height) & (y < top + self.heights[image]))
+
+    # Live slots whose bottom edge is below the line at y
+    def below(self, y):
+        n = self.size
+        return np.flatnonzero(self.alive[:n] & (self.y[:n] + self.heights[self.image[:n]] > y))
+
+    # Live slots that have gone all the way off the top or bottom edge they are moving towards
+    def off_screen(self, height):
+        n = self.size
+        top = self.y[:n]
+        vy = self.vy[:n]
+        return np.flatnonzero(self.alive[:n] & (((vy > 0) & (top >= height)) |
+            ((vy < 0) & (top + self.heights[self.image[:n]] <= 0))))
+
+    # Draws every live entity that is on the window with one call, returns the rects drawn over
+    # alpha is how far it is from the last update to the next one, 0 draws them where they were and 1 where they are
+    def draw(self, window, alpha=1.0):
+        slots = self.overlapping(0, 0, window.get_width(), window.get_height())
+        last_x = self.last_x[slots]
+        last_y = self.last_y[slots]
+        xs = last_x + (self.x[slots] - last_x) * alpha
+        ys = last_y + (self.y[slots] - last_y) * alpha
+        images = [assets.image(name) for name in self.image_names]
+        return window.blits([(images[image], (x, y)) for image, x, y in
+            zip(self.image[slots].tolist(), xs.tolist(), ys.tolist())])
+
+
+# One entity in a store looked at like an object, for the places that want x, y and mask (like collide)
+class Entity:
+    __slots__ = ("store", "slot")
+
+    def __init__(self, store, slot):
+        self.store = store
+        self.slot = slot
+
+    @property
+    def x(self):
+        return self.store.x[self.slot]
+
+    @property
+    def y(self):
+        return self.store.y[self.slot]
+
+    @property
+    def image_name(self):
+        return self.store.image_names[self.store.image[self.slot]]
+
+    @property
+    def image(self):
+        return assets.image(self.image_name)
+
+    @property
+    def mask(self):
+        return self.store.masks[self.store.image[self.slot]]
@@ -0,0 +1,227 @@
+# Lots of games at once with no window, for bots to play against
+# Every game runs the same fixed update as the real game (Game.update, so the same Player, Enemy and collide rules),
+# all of them step together: a batch of actions in, a batch of observations, rewards and done flags out.
+# A game that is done starts again by itself, the observation it gives back is the first one of the new game.
+#
+#   env = VecEnv(64, seed=0)
+#   observations = env.reset()
+#   observations, rewards, dones = env.step(actions)
+#
+# An action is the keys held down as a bitmask like in recordings, bit i for replay.KEYS[i] (up, down, left, right, space),
+# so a number from 0 to ACTIONS - 1. ProcessVecEnv is the same thing split over worker processes, with the
+# actions, observations, rewards and done flags all in shared memory so nothing gets copied between them.
+import argparse
+import ctypes
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from main import Game, WIDTH, HEIGHT
+from replay import KEY_STATES
+
+ACTIONS = len(KEY_STATES)
+# How many of the closest enemies and enemy lasers go in an observation
+NEAREST = 8
+# Player x, y, health and lives, then x, y and whether its there for each of the closest enemies and enemy lasers
+OBSERVATION_SIZE = 4 + 2 * 3 * NEAREST
+# Rewards for each enemy shot down, each life lost and each point of health lost
+KILL_REWARD = 1.0
+LIFE_REWARD = -1.0
+HEALTH_REWARD = -0.01
+# Game k of instance i is seeded seed + i + k * EPISODE_SEED_STRIDE, so no two games in a batch get the same seed
+EPISODE_SEED_STRIDE = 1 << 20
+
+
+# Writes what a bot gets to see of game into out, a float32 array of OBSERVATION_SIZE
+# Everything is scaled to about 0 to 1 by the size of the window, full health and the lives a game starts with
+def observe(game, out):
+    player = game.player
+    out[0] = player.x / WIDTH
+    out[1] = player.y / HEIGHT
+    out[2] = player.health / 100
+    out[3] = game.lives / 5
+    player_x = player.x + player.get_width() / 2
+    player_y = player.y + player.get_height() / 2
+    start = 4
+    for store in (game.enemies, game.enemy_lasers):
+        nearest = out[start:start + 3 * NEAREST].reshape(NEAREST, 3)
+        nearest[:] = 0
+        slots = store.live()
+        if len(slots):
+            distance = (store.x[slots] - player_x) ** 2 + (store.y[slots] - player_y) ** 2
+            # Closest first
+            if len(slots) > NEAREST:
+                closest = np.argpartition(distance, NEAREST)[:NEAREST]
+                slots, distance = slots[closest], distance[closest]
+            slots = slots[np.argsort(distance, kind="stable")]
+            nearest[:len(slots), 0] = store.x[slots] / WIDTH
+            nearest[:len(slots), 1] = store.y[slots] / HEIGHT
+            nearest[:len(slots), 2] = 1
+        start += 3 * NEAREST
+
+
+class VecEnv:
+    # num_envs games stepped together in this process
+    # frame_skip is how many updates each step runs with the same action
+    # max_ticks ends a game after that many updates even if it isnt lost, None to play every game until its lost
+    # observations, rewards and dones are arrays to write into, made here when not given (ProcessVecEnv gives it shared ones)
+    def __init__(self, num_envs, seed=0, frame_skip=1, max_ticks=None, observations=None, rewards=None, dones=None):
+        self.num_envs = num_envs
+        self.seed = seed
+        self.frame_skip = frame_skip
+        self.max_ticks = max_ticks
+        self.observations = np.zeros((num_envs, OBSERVATION_SIZE), np.float32) if observations is None else observations
+        self.rewards = np.zeros(num_envs, np.float32) if rewards is None else rewards
+        self.dones = np.zeros(num_envs, bool) if dones is None else dones
+        # How many games each instance has started
+        self.episodes = [0] * num_envs
+        self.games = [None] * num_envs
+
+    def new_game(self, i):
+        game = Game(self.seed + i + self.episodes[i] * EPISODE_SEED_STRIDE)
+        self.episodes[i] += 1
+        self.games[i] = game
+        return game
+
+    # Starts a new game in every instance and returns the first observations
+    def reset(self):
+        for i in range(self.num_envs):
+            observe(self.new_game(i), self.observations[i])
+        self.rewards[:] = 0
+        self.dones[:] = False
+        return self.observations
+
+    # actions is one action per instance
+    # The arrays given back are written over by the next step, copy them to keep them
+    def step(self, actions):
+        frame_skip = self.frame_skip
+        max_ticks = self.max_ticks
+        for i, game in enumerate(self.games):
+            keys = KEY_STATES[actions[i]]
+            player = game.player
+            kills, lives, health = game.kills, game.lives, player.health
+            for _ in range(frame_skip):
+                game.update(keys)
+                lost = game.lives <= 0 or player.health <= 0
+                if lost:
+                    break
+            self.rewards[i] = (KILL_REWARD * (game.kills - kills) + LIFE_REWARD * (lives - game.lives) +
+                HEALTH_REWARD * (health - player.health))
+            done = lost or (max_ticks is not None and game.ticks >= max_ticks)
+            self.dones[i] = done
+            if done:
+                game = self.new_game(i)
+            observe(game, self.observations[i])
+        return self.observations, self.rewards, self.dones
+
+
+# Runs a VecEnv over instances start to start + count of the shared arrays, stepping it whenever its told to
+def worker(connection, start, count, total, shared, seed, frame_skip, max_ticks):
+    actions, observations, rewards, dones = shared_arrays(shared, total)
+    end = start + count
+    env = VecEnv(count, seed + start, frame_skip, max_ticks, observations[start:end], rewards[start:end], dones[start:end])
+    actions = actions[start:end]
+    while True:
+        command = connection.recv()
+        if command == "step":
+            env.step(actions)
+        elif command == "reset":
+            env.reset()
+        else:
+            break
+        connection.send(None)
+
+
+# NumPy views of the shared (actions, observations, rewards, dones) buffers
+def shared_arrays(shared, total):
+    actions, observations, rewards, dones = shared
+    return (np.frombuffer(actions, np.uint8),
+        np.frombuffer(observations, np.float32).reshape(total, OBSERVATION_SIZE),
+        np.frombuffer(rewards, np.float32),
+        np.frombuffer(dones, np.bool_))
+
+
+class ProcessVecEnv:
+    # Same as VecEnv but with the instances split as evenly as they go over workers processes (one per CPU when None)
+    # Close it when done with it (or use it in a with block) to stop the workers
+    def __init__(self, num_envs, workers=None, seed=0, frame_skip=1, max_ticks=None):
+        self.num_envs = num_envs
+        workers = min(workers or os.cpu_count() or 1, num_envs)
+        shared = (multiprocessing.RawArray(ctypes.c_uint8, num_envs),
+            multiprocessing.RawArray(ctypes.c_float, num_envs * OBSERVATION_SIZE),
+            multiprocessing.RawArray(ctypes.c_float, num_envs),
+            multiprocessing.RawArray(ctypes.c_bool, num_envs))
+        self.actions, self.observations, self.rewards, self.dones = shared_arrays(shared, num_envs)
+        self.connections = []
+        self.processes = []
+        for shard in np.array_split(np.arange(num_envs), workers):
+            connection, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=worker, daemon=True,
+                args=(child, int(shard[0]), len(shard), num_envs, shared, seed, frame_skip, max_ticks))
+            process.start()
+            child.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Sends command to every worker and waits for all of them to finish it
+    def send(self, command):
+        for connection in self.connections:
+            connection.send(command)
+        for connection in self.connections:
+            connection.recv()
+
+    def reset(self):
+        self.send("reset")
+        return self.observations
+
+    # Same as VecEnv.step, the arrays given back are the shared ones and get written over by the next step
+    def step(self, actions):
+        self.actions[:] = actions
+        self.send("step")
+        return self.observations, self.rewards, self.dones
+
+    def close(self):
+        for connection in self.connections:
+            connection.send("close")
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.connections = []
+        self.processes = []
+
+
+# Steps random actions through a batch of games to see how many steps an hour it does
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Space Invaders batched environment benchmark")
+    parser.add_argument("--envs", type=int, default=64, help="games stepped together")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, 0 to step every game in this process (default one per CPU)")
+    parser.add_argument("--steps", type=int, default=1000, help="steps of the whole batch to run")
+    parser.add_argument("--frame-skip", type=int, default=1, help="updates each step runs with the same action")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.workers == 0:
+        env = VecEnv(args.envs, args.seed, args.frame_skip)
+    else:
+        env = ProcessVecEnv(args.envs, args.workers, args.seed, args.frame_skip)
+    rng = np.random.default_rng(args.seed)
+    env.reset()
+    episodes = 0
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        observations, rewards, dones = env.step(rng.integers(0, ACTIONS, args.envs))
+        episodes += int(dones.sum())
+    seconds = time.perf_counter() - start
+    if isinstance(env, ProcessVecEnv):
+        env.close()
+    steps = args.steps * args.envs
+    print(f"{steps} steps in {seconds:.2f}s, {steps / seconds:.0f} steps/s ({steps / seconds * 3600 / 1e6:.1f} million an hour), "
+        f"{episodes} games finished")
@@ -1,52 +1,131 @@
 import pygame
-import os
+import sys
 import time
 import random
-pygame.font.init()
+import math
+import argparse
+import numpy as np
+from collision import rects_overlap
+from entities import EntityStore, Entity
+from assets import assets
+from render import Renderer
+from profiler import FrameProfiler
+from replay import Recorder, Recording
+from scheduler import Scheduler
 
 # Pygame library information to start game
 WIDTH, HEIGHT = 750,750
-WINDOW = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Space Invaders")
+# Made by open_window, the headless mode never makes one
+WINDOW = None
 
-# Load image assets into script
-RED_SPACE_SHIP = pygame.image.load(os.path.join("assets", "pixel_ship_red_small.png"))
-BLUE_SPACE_SHIP = pygame.image.load(os.path.join("assets", "pixel_ship_blue_small.png"))
-GREEN_SPACE_SHIP = pygame.image.load(os.path.join("assets", "pixel_ship_green_small.png"))
-YELLOW_SPACE_SHIP = pygame.image.load(os.path.join("assets", "pixel_ship_yellow.png"))
+# The game runs this many updates a second however fast it gets drawn, all the speeds are in pixels per update
+TICK_RATE = 60
+TICK = 1 / TICK_RATE
+# Most updates to catch up on in one frame, so a long stall doesnt freeze the game while it catches up
+MAX_TICKS_PER_FRAME = 5
+FPS = 60
 
-RED_LASER = pygame.image.load(os.path.join("assets", "pixel_laser_red.png"))
-BLUE_LASER = pygame.image.load(os.path.join("assets", "pixel_laser_blue.png"))
-GREEN_LASER = pygame.image.load(os.path.join("assets", "pixel_laser_green.png"))
-YELLOW_LASER = pygame.image.load(os.path.join("assets", "pixel_laser_yellow.png"))
+# Every update every enemy has this chance of shooting, with 60 updates a second thats about once every 10s
+SHOT_CHANCE = 1 / (10 * TICK_RATE)
+# Enemies start off above the screen and are only added to the game once they get this close to the top of it,
+# before that nothing about them changes but their y so there is nothing to update or draw
+ARRIVAL_MARGIN = 100
+
+# Image assets, loaded by assets (see assets.py) the first time they get used
+RED_SPACE_SHIP = "pixel_ship_red_small.png"
+BLUE_SPACE_SHIP = "pixel_ship_blue_small.png"
+GREEN_SPACE_SHIP = "pixel_ship_green_small.png"
+YELLOW_SPACE_SHIP = "pixel_ship_yellow.png"
+
+RED_LASER = "pixel_laser_red.png"
+BLUE_LASER = "pixel_laser_blue.png"
+GREEN_LASER = "pixel_laser_green.png"
+YELLOW_LASER = "pixel_laser_yellow.png"
+
+BG = "background-black.png"
+
+# Background scaled to fill the window, the scaled copy is only made once
+def background():
+    return assets.image(BG, (WIDTH, HEIGHT), alpha=False)
 
-BG = pygame.transform.scale(pygame.image.load(os.path.join("assets", "background-black.png")), (WIDTH, HEIGHT))
 
 # Class for all lasers
 # Since laser object is called within the Ship object, once the ship dies the laser array associeted with the ship will also be deleted
 class Laser:
+    # Lots of lasers get made and moved every frame, slots keep them small and quick to get at
+    __slots__ = ("x", "y", "last_y", "image", "mask", "index")
+
     # Laser x pos will always be constant
+    # image is the name of the laser's image in assets
     def __init__(self, x, y, image):
         self.x = x
         self.y = y
-        self.image = image
-        # For making laser hitbox
-        self.mask = pygame.mask.from_surface(self.image)
+        # Where it was before the last move, for drawing between updates
+        self.last_y = y
+        self.image = assets.image(image) if image is not None else None
+        # For making laser hitbox, shared with every other laser with the same image
+        self.mask = assets.mask(image) if image is not None else None
+        # Where it is in its pool's active list
+        self.index = None
 
     def draw(self, window):
         window.blit(self.image, (self.x, self.y))
     
     def move(self, velocity):
+        self.last_y = self.y
         self.y += velocity
 
-    # if y position is below of above screen return "True"
-    def off_screen(self, height):
-        return self.y >= height and self.y <= 0
+    # True once the laser has gone all the way off the edge its moving towards
+    # Enemy lasers start above the screen and come down onto it, so they only count as gone past the bottom
+    def off_screen(self, height, velocity):
+        if velocity > 0:
+            return self.y >= height
+        return self.y + self.image.get_height() <= 0
 
     def collision(self, object):
         return collide(self, object)
 
 
+# Fixed set of lasers for one ship, made when the ship is and reused for every shot after that
+# Lasers in flight are kept in a list with no gaps so moving and drawing them is a plain loop,
+# a laser that leaves takes the last one's place so nothing gets shifted down
+class LaserPool:
+    # A laser crosses the screen in about 150 frames and ships can shoot every 30, so 8 is plenty
+    SIZE = 8
+
+    def __init__(self, size=SIZE):
+        self.free = [Laser(0, 0, None) for i in range(size)]
+        self.active = []
+
+    def __iter__(self):
+        return iter(self.active)
+
+    def __len__(self):
+        return len(self.active)
+
+    # Laser from a free slot, or None if they are all in flight
+    def fire(self, x, y, image):
+        if not self.free:
+            return None
+        laser = self.free.pop()
+        laser.x = x
+        laser.y = y
+        laser.last_y = y
+        laser.image = assets.image(image)
+        laser.mask = assets.mask(image)
+        laser.index = len(self.active)
+        self.active.append(laser)
+        return laser
+
+    def release(self, laser):
+        last = self.active.pop()
+        if last is not laser:
+            self.active[laser.index] = last
+            last.index = laser.index
+        laser.index = None
+        self.free.append(laser)
+
+
 # Abstract Class... Class not used, but we inheirit from it (Have Subclasses for other ships)
 class Ship:
 
@@ -57,35 +136,29 @@ class Ship:
     def __init__(self, x, y, health = 100):
         self.x = x
         self.y = y
+        # Where it was before the last update, for drawing between updates
+        self.last_x = x
+        self.last_y = y
         self.health = health
         # Defined as none for now but these attributes will be inherited by enemy ship subclasse
         self.ship_image = None
         self.laser_image = None
-        self.lasers = []
+        self.lasers = LaserPool()
         self.cool_down_counter = 0
 
         self.max_health = 100
 
-    def draw(self, WINDOW):
+    # alpha is how far it is from the last update to the next one, 0 draws it where it was and 1 where it is
+    # Returns the rects it drew over
+    def draw(self, WINDOW, alpha=1.0):
         # Pygame function to draw ship
-        WINDOW.blit(self.ship_image, (self.x, self.y))
+        rects = [WINDOW.blit(self.ship_image, self.position(alpha))]
 
-        for laser in self.lasers:
-            laser.draw(WINDOW)
+        rects.extend(WINDOW.blits([(laser.image, (laser.x, laser.last_y + (laser.y - laser.last_y) * alpha)) for laser in self.lasers]))
+        return rects
 
-    # Object is to check for collision of player and enemy laser
-    def move_lasers(self, velocity, object):
-        # Increments cooldown
-        self.cooldown()
-        for laser in self.lasers:
-            laser.move(velocity)
-            # If laser doesnt hit anything
-            if laser.off_screen(HEIGHT):
-                self.lasers.remove(laser)
-            # If laser Hits player
-            elif laser.collision(object):
-                object.health -= 10
-                self.lasers.remove(laser)
+    def position(self, alpha):
+        return self.last_x + (self.x - self.last_x) * alpha, self.last_y + (self.y - self.last_y) * alpha
 
     def cooldown(self):
         # If our counter is more than or equal to o.5s, we set it back to 0
@@ -103,8 +176,8 @@ class Ship:
         if self.cool_down_counter == 0:
             # This position for the laser is only good for player ship size
             # Enemy subclass can have its own starting position for laser
-            laser = Laser(self.x, self.y, self.laser_image)
-            self.lasers.append(laser)
+            # Nothing happens if all the ship's lasers are still flying
+            self.lasers.fire(self.x, self.y, self.laser_image)
             # Set to one just to show that laser has been shot and cooldown can start incrementing till "COOLDOWN" frames
             self.cool_down_counter = 1
 
@@ -119,210 +192,458 @@ class Player(Ship):
     def __init__(self, x, y, health=100):
         # Automatically calls the parent init method
         super().__init__(x, y, health)
-        self.ship_image = YELLOW_SPACE_SHIP
+        self.ship_image = assets.image(YELLOW_SPACE_SHIP)
+        # Lasers are fired by the name of their image
         self.laser_image = YELLOW_LASER
         # Pygame has this function to know which pixels are filled in by image and can be hitbox
-        self.mask = pygame.mask.from_surface(self.ship_image)
+        self.mask = assets.mask(YELLOW_SPACE_SHIP)
         self.health = health
 
 
-    # Objects is to check for collision of enemy and player laser
+    # Objects is the EntityStore of enemies to check for collision with player lasers
+    # Returns how many enemies got shot down
     def move_lasers(self, velocity, objects):
         # Increments cooldown
         self.cooldown()
-        for laser in self.lasers:
+        shot = 0
+        # Backwards so the laser moved into a released one's place has already been done
+        active = self.lasers.active
+        for i in range(len(active) - 1, -1, -1):
+            laser = active[i]
             laser.move(velocity)
             # If laser leaves screen
-            if laser.off_screen(HEIGHT):
-                self.lasers.remove(laser)
+            if laser.off_screen(HEIGHT, velocity):
+                self.lasers.release(laser)
             # If laser is still on screen iterate through each enemy to find id on eis hit and if it is remove it
             else:
-                for object in objects:
-                    if laser.collision(object):
-                        objects.remove(object)
-                        # Just make sure laser in in the list before youremove it
-                        if laser in self.lasers:
-                            self.lasers.remove(laser)
+                # Only the enemies whose rects touch the laser get the pixel test
+                width, height = laser.mask.get_size()
+                hits = [slot for slot in objects.overlapping(laser.x, laser.y, width, height) if laser.collision(Enemy(objects, slot))]
+                # One laser can take out every enemy it touches but it only goes back to the pool once
+                if hits:
+                    objects.kill(hits)
+                    self.lasers.release(laser)
+                    shot += len(hits)
+        return shot
 
     # Override parent draw method
     # Adding the healthbar to the parent draw function
-    def draw(self, WINDOW):
-        super().draw(WINDOW)
-        self.healthbar(WINDOW)
+    def draw(self, WINDOW, alpha=1.0):
+        return super().draw(WINDOW, alpha) + self.healthbar(WINDOW, alpha)
 
-    def healthbar(self, window):
-        pygame.draw.rect(window, (255, 0, 0), (self.x, self.y + self.ship_image.get_height() + 10, self.ship_image.get_width(), 10))
+    def healthbar(self, window, alpha=1.0):
+        x, y = self.position(alpha)
+        red = pygame.draw.rect(window, (255, 0, 0), (x, y + self.ship_image.get_height() + 10, self.ship_image.get_width(), 10))
         # Gets percentage of red rectangle that will be filled by green rectangle
-        pygame.draw.rect(window, (0, 255, 0), (self.x, self.y + self.ship_image.get_height() + 10, (self.ship_image.get_width()) * (self.health/self.max_health), 10))
+        pygame.draw.rect(window, (0, 255, 0), (x, y + self.ship_image.get_height() + 10, (self.ship_image.get_width()) * (self.health/self.max_health), 10))
+        # The green part is always inside the red one
+        return [red]
 
 
-class Enemy(Ship):
+# Enemies live in an EntityStore (see entities.py) so a whole wave can be moved with one array operation
+# An Enemy object is just a way to look at one of them, made when something needs a single enemy
+# It isnt a Ship: its lasers and cooldown live in the stores too (see Game.update), so it only has what collide and shooting need
+class Enemy(Entity):
     COLOR_MAP = {
         "red": (RED_SPACE_SHIP, RED_LASER),
         "blue": (BLUE_SPACE_SHIP, BLUE_LASER),
         "green": (GREEN_SPACE_SHIP, GREEN_LASER)
         }
-    def __init__(self, x, y, color,health=100):
-        super().__init__(x, y, health)
-        self.ship_image, self.laser_image = self.COLOR_MAP[color]
-        # for hitbox
-        self.mask = pygame.mask.from_surface(self.ship_image)
+    # Which laser goes with which ship, by image name
+    LASER_IMAGES = {ship_image: laser_image for ship_image, laser_image in COLOR_MAP.values()}
+
+    # Adds a new enemy to store, moving down velocity pixels a frame
+    @classmethod
+    def spawn(cls, store, x, y, color, velocity, health=100):
+        ship_image = cls.COLOR_MAP[color][0]
+        return cls(store, store.spawn(x, y, ship_image, vy=velocity, health=health))
+
+    @property
+    def ship_image(self):
+        return self.image
+
+    @property
+    def laser_image(self):
+        return self.LASER_IMAGES[self.image_name]
+
+    @property
+    def health(self):
+        return self.store.health[self.slot]
 
     def move(self, velocity):
-        self.y += velocity
+        self.store.y[self.slot] += velocity
 
-    # Static Polymorphism
-    # Method is already in Ship class but since this is a subclass, it will overide the Ship shoot method for all enemies so they have diff shoot properties
-    def shoot(self):
-        if self.cool_down_counter == 0:
+    # Enemy lasers go in the lasers store, not a pool of their own
+    def shoot(self, lasers, velocity):
+        if self.store.cooldown[self.slot] == 0:
             # width of laser pic has diff pixels than width of enemy pics (laser width is 100px) (enemy pics vary so we get width enem every time)
             # So to get enemy center, "self.x - 100/50 px + enemy_width/2" 
-            laser = Laser(self.x - (self.laser_image.get_width()/2) + (self.ship_image.get_width()/2), self.y, self.laser_image)
-            self.lasers.append(laser)
-            self.cool_down_counter = 1
+            lasers.spawn(self.x - (assets.image(self.laser_image).get_width()/2) + (self.ship_image.get_width()/2), self.y, self.laser_image, vy=velocity)
+            self.store.cooldown[self.slot] = 1
 
 
 def collide(object1, object2):
+    # Skip the pixel test when they arent even close
+    if not rects_overlap(object1, object2):
+        return False
     # Distance from object1 to object2
     offset_x = object2.x - object1.x
     offset_y = object2.y - object1.y
     return object1.mask.overlap(object2.mask, (offset_x, offset_y)) != None 
 
-def main():
-    run = True
-    FPS = 60
-    # Level starts at beginning of game there are no enemies so game will incrememnt to start at 1
-    level = 0
-    lives = 5
-    main_font = pygame.font.SysFont("agencyfb", 50, True)
-    lost_font = pygame.font.SysFont("agencyfb", 80, True)
-
-    enemies = []
-    wave_length = 5
-
+# Everything about one game, moved on by update and drawn by draw
+# Nothing in here needs a window so the headless mode can run it as fast as it goes
+class Game:
     enemy_velocity = 1
     player_velocity = 5
     laser_velocity = 5
 
-    # Instance of Ship and starting position (x is centered cuz its half of window minus half of ship)
-    player = Player(375-50, 500)
+    # seed makes the game play out the same every time for the same keys, None picks one at random
+    def __init__(self, seed=None):
+        # Enemy positions and colors come from rng, who shoots when from shot_rng
+        self.rng = random.Random(seed)
+        self.shot_rng = np.random.default_rng(seed)
+        # Level starts at beginning of game there are no enemies so game will incrememnt to start at 1
+        self.level = 0
+        self.lives = 5
+        # Every enemy and every enemy laser, kept as arrays
+        self.enemies = EntityStore()
+        self.enemy_lasers = EntityStore()
+        self.wave_length = 5
+        # (x, y, color) of enemies in the wave still on their way down to the screen, by the update they get there
+        self.arrivals = Scheduler()
+        # (slot, id) of enemies by the next update they get a chance to shoot on
+        self.shots = Scheduler()
+        # Instance of Ship and starting position (x is centered cuz its half of window minus half of ship)
+        self.player = Player(375-50, 500)
+        self.ticks = 0
+        # Enemies the player has shot down
+        self.kills = 0
+        self.lost = False
+        # Number of updates we have gone thru with lost text rendered
+        self.lost_count = 0
+        # profiler.FrameProfiler timing each part of update, None when not profiling
+        self.profiler = None
+
+    # True once the lost screen has been up for 3 seconds
+    def over(self):
+        return self.lost_count > TICK_RATE * 3
+
+    # (level, enemies, lasers) for the profiler
+    def counts(self):
+        return self.level, len(self.enemies), len(self.enemy_lasers) + len(self.player.lasers)
+
+    # Picks the next update the enemy in slot gets to shoot on, some time after the update after
+    # The number of updates until an enemy shoots is geometric, so drawing it once is the same as rolling SHOT_CHANCE every update
+    def schedule_shot(self, slot, after):
+        due = after + int(self.shot_rng.geometric(SHOT_CHANCE))
+        self.shots.schedule(due, (slot, self.enemies.id[slot]))
+
+    # One fixed step of the game, keys is pygame.key.get_pressed() or anything else that can be indexed by key
+    def update(self, keys):
+        self.ticks += 1
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.updates += 1
+        player = self.player
+        enemies = self.enemies
+        enemy_lasers = self.enemy_lasers
+        player.last_x = player.x
+        player.last_y = player.y
+
+        if self.lives <= 0 or player.health <= 0:
+            self.lost = True
+            self.lost_count += 1
+
+        # While we lost and are waiting for 3 second loss screen nothing moves
+        if self.lost == True:
+            return
+
+        if len(enemies) == 0 and len(self.arrivals) == 0:
+            self.level += 1
+            self.wave_length += 5
+            #Spawns new enemeies for new level
+            for i in range(self.wave_length):
+                x = self.rng.randrange(50, WIDTH - 100)
+                y = self.rng.randrange(-1500, -100)
+                color = self.rng.choice(["red", "blue", "green"])
+                # Works out when it gets to ARRIVAL_MARGIN above the screen and where it is by then
+                ticks = max(0, math.ceil((-ARRIVAL_MARGIN - y) / self.enemy_velocity))
+                self.arrivals.schedule(self.ticks + ticks, (x, y + ticks * self.enemy_velocity, color))
+        # Creates the instances of enemy that got near the screen
+        for x, y, color in self.arrivals.due(self.ticks):
+            enemy = Enemy.spawn(enemies, x, y, color, self.enemy_velocity)
+            # It can shoot on this update already
+            self.schedule_shot(enemy.slot, self.ticks - 1)
+        if profiler is not None:
+            profiler.mark("spawn")
+
+        player_velocity = self.player_velocity
+        # Remember y == 0 is the top of the page
+        if keys[pygame.K_UP] and player.y - player_velocity > 0:
+            player.y -= player_velocity
+        # Player velocity is the number of pixels in the next move, so if the pixels will move it past the height, dont move
+        if keys[pygame.K_DOWN] and player.y + player_velocity + player.get_height() + 20 < HEIGHT:
+            player.y += player_velocity
+        if keys[pygame.K_LEFT] and player.x - player_velocity > 0:
+            player.x -= player_velocity
+        # Uses Atribute from Ship class on player instance
+        if keys[pygame.K_RIGHT] and player.x + player_velocity + player.get_width() < WIDTH:
+            player.x += player_velocity
+        # Space to shoot
+        if keys[pygame.K_SPACE]:
+            player.shoot()
+        if profiler is not None:
+            profiler.mark("player")
+
+        # Every enemy laser moves at once
+        enemy_lasers.move()
+        enemy_lasers.kill(enemy_lasers.off_screen(HEIGHT))
 
-    # Creating an instance of clock that will be told to click 60 times a second in the while loop
-    clock = pygame.time.Clock()
+        # Enemy lasers that hit the player, only the ones whose rects touch the player get the pixel test
+        for slot in enemy_lasers.overlapping(player.x, player.y, player.get_width(), player.get_height()):
+            if collide(Entity(enemy_lasers, slot), player):
+                player.health -= 10
+                enemy_lasers.kill(slot)
+        if profiler is not None:
+            profiler.mark("enemy_lasers")
+
+        # Every enemy moves and cools down at once
+        enemies.move()
+        enemies.tick_cooldowns(Ship.COOLDOWN)
+
+        # Only the enemies whose shot is due get looked at, ones that died or whose slot got reused since are skipped
+        # An enemy still cooling down misses its shot same as when the chance came up every update
+        for slot, id in self.shots.due(self.ticks):
+            if enemies.holds(slot, id):
+                Enemy(enemies, slot).shoot(enemy_lasers, self.laser_velocity)
+                self.schedule_shot(slot, self.ticks)
+
+        # If enemy and player collide, player loses health (uses collide function)
+        crashed = [slot for slot in enemies.overlapping(player.x, player.y, player.get_width(), player.get_height())
+            if collide(Enemy(enemies, slot), player)]
+        player.health -= 10 * len(crashed)
+        enemies.kill(crashed)
+
+        # If enemies get past end of screen you lose a life
+        escaped = enemies.below(HEIGHT)
+        self.lives -= len(escaped)
+        enemies.kill(escaped)
+        if profiler is not None:
+            profiler.mark("enemies")
 
-    lost = False
-    # Number of frames we have gone thru with lost text rendered
-    lost_count = 0
+        # When move_laser is called for a player the laser will go up because we give a negative velocity so pos will go towards 0 (top of screen)
+        self.kills += player.move_lasers(-self.laser_velocity, enemies)
+        if profiler is not None:
+            profiler.mark("player_lasers")
 
-    # Funtion can only be called from within main function
-    def redraw_window():
-        WINDOW.blit(BG, (0,0))
+    # alpha is how far between the last update and the next one this frame is
+    # renderer is a render.Renderer, call its begin before and finish after
+    def draw(self, renderer, fonts, alpha):
+        main_font, lost_font = fonts
+        window = renderer.window
 
-        # Add text to screen
-        lives_label = main_font.render(f"Lives: {lives}", 1, (255, 0, 0))
-        level_label = main_font.render(f"Level: {level}", 1, (255, 255, 255))
-        WINDOW.blit(lives_label, (WIDTH - lives_label.get_width() - 10, 10))
-        WINDOW.blit(level_label, (10,10))
+        # Add text to screen, its only rendered again when the lives or level change
+        renderer.label("lives", main_font, f"Lives: {self.lives}", (255, 0, 0), lambda width, height: (WIDTH - width - 10, 10))
+        renderer.label("level", main_font, f"Level: {self.level}", (255, 255, 255), (10,10))
 
+        renderer.add(self.enemies.draw(window, alpha))
+        renderer.add(self.enemy_lasers.draw(window, alpha))
 
-        for enemy in enemies:
-            enemy.draw(WINDOW)
-        
-        player.draw(WINDOW)
+        renderer.add(self.player.draw(window, alpha))
 
-        # This is before the other "if lost == True" statement cuz we want to be executed each time before the "continue"
-        if lost == True:
-            lost_label = lost_font.render("You Lost", 1, (255, 0, 0))
-            WINDOW.blit(lost_label, (WIDTH/2 - lost_label.get_width()/2, 350))
+        if self.lost == True:
+            renderer.label("lost", lost_font, "You Lost", (255, 0, 0), lambda width, height: (WIDTH/2 - width/2, 350))
 
-        pygame.display.update()
 
-    # Tells game too keep refreshing and checking stuff till run is no longer set to true
-    while run == True:
-        clock.tick(FPS)
+def open_window():
+    global WINDOW
+    WINDOW = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Space Invaders")
+    # Text is only ever drawn in the window, so fonts are only started with it
+    pygame.font.init()
 
-        # Keep redrawing window for every tick
-        redraw_window()
 
-        if lives <= 0 or player.health <= 0:
-            lost = True
-            lost_count += 1
+# profile_csv is a file to write how long each part of every frame took, see profiler.py
+# record_path is a file to save the game to so it can be replayed, see replay.py
+def main(seed=None, profile_csv=None, record_path=None):
+    main_font = pygame.font.SysFont("agencyfb", 50, True)
+    lost_font = pygame.font.SysFont("agencyfb", 80, True)
+    overlay_font = pygame.font.SysFont("monospace", 16)
+    recorder = None
+    if record_path is not None:
+        # A replay needs to know the seed
+        if seed is None:
+            seed = random.randrange(2**32)
+        recorder = Recorder(seed)
+    game = Game(seed)
+    renderer = Renderer(WINDOW, background())
+    # Only made once there is something to profile for, the CSV or the overlay (F3)
+    profiler = FrameProfiler(1000 / FPS, profile_csv) if profile_csv is not None else None
+    game.profiler = profiler
+    show_overlay = False
 
-        # While we lost and are waiting for 3 second loss screen we keep continuing the loop
-        # "Continue" keeps starting back at top of while loop so nun below gets done during this time
-        if lost == True:
-            if lost_count > FPS * 3:
-                run = False
-            else:
-                continue
+    # Creating an instance of clock that will be told to click 60 times a second in the while loop
+    clock = pygame.time.Clock()
+    # Time not yet turned into updates
+    lag = 0.0
 
+    # Tells game too keep refreshing and checking stuff till the lost screen is done
+    while not game.over():
+        # Updates catch up with however long the last frame took, slow drawing doesnt slow the game down
+        lag = min(lag + clock.tick(FPS) / 1000, MAX_TICKS_PER_FRAME * TICK)
+        if profiler is not None:
+            profiler.begin_frame()
 
-        if len(enemies) == 0:
-            level += 1
-            wave_length += 5
-            #Spawns new enemeies for new level
-            for i in range(wave_length):
-                # Creates multiple instances of enemy
-                enemy = Enemy(random.randrange(50, WIDTH - 100), random.randrange(-1500, -100), random.choice(["red", "blue", "green"]))
-                enemies.append(enemy)
-        
         # Gets every event from queue
         for event in pygame.event.get():
             # This checks for click even for quit button which will make run = false and stop the while loop stoppping game
             if event.type == pygame.QUIT: # "Quit is the red x button"
                 # run = False <-- can use this if i want x button to just stop running game which will send me back to menu
+                if profiler is not None:
+                    profiler.close()
+                if recorder is not None:
+                    recorder.save(record_path)
                 quit() # <-- Exits window completely when x button is pressed
+            # F3 shows and hides the profiler overlay
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                show_overlay = not show_overlay
+                if show_overlay and profiler is None:
+                    profiler = game.profiler = FrameProfiler(1000 / FPS)
+                    profiler.begin_frame()
+                elif not show_overlay and profile_csv is None:
+                    profiler = game.profiler = None
+        if profiler is not None:
+            profiler.mark("events")
 
         # Returns dictionary of all keyes and whether they are pressed or not (for every frame)
         keys = pygame.key.get_pressed()
-        # Remember y == 0 is the top of the page
-        if keys[pygame.K_UP] and player.y - player_velocity > 0:
-            player.y -= player_velocity
-        # Player velocity is the number of pixels in the next move, so if the pixels will move it past the height, dont move
-        if keys[pygame.K_DOWN] and player.y + player_velocity + player.get_height() + 20 < HEIGHT:
-            player.y += player_velocity
-        if keys[pygame.K_LEFT] and player.x - player_velocity > 0:
-            player.x -= player_velocity
-        # Uses Atribute from Ship class on player instance
-        if keys[pygame.K_RIGHT] and player.x + player_velocity + player.get_width() < WIDTH:
-            player.x += player_velocity
-        # Space to shoot
-        if keys[pygame.K_SPACE]:
-            player.shoot()
-
-        # Move method is in the Enemy Subclass and is being used on these instances of enemy
-        for enemy in enemies[:]:
-            enemy.move(enemy_velocity)
-            enemy.move_lasers(laser_velocity, player)
-
-            # For erry frame the enemy is randomly going to chose number
-            # If random number is 1 then enemy shoots
-            # Since rand is 0-10*60, and game is 60fps, we can assume the enemy gonna shoot on average once erry 10s
-            if random.randrange(0, 10*60) == 1:
-                enemy.shoot()
-
-            # If enemy and player collide, player loses health (uses collide function)
-            if collide(enemy, player):
-                player.health -= 10
-                enemies.remove(enemy)
-
-            # If enemies get past end of screen you lose a life
-            elif enemy.y + enemy.get_height() > HEIGHT:
-                lives -= 1
-                enemies.remove(enemy)
-
-        
-        # When move_laser is called for a player the laser will go up because we give a negative velocity so pos will go towards 0 (top of screen)
-        player.move_lasers(-laser_velocity, enemies)
-
-
-def main_menu():
+        while lag >= TICK:
+            game.update(keys)
+            if recorder is not None:
+                recorder.record(keys)
+            lag -= TICK
+
+        # Drawn part way to the next update so movement looks smooth whatever the frame rate
+        renderer.begin()
+        game.draw(renderer, (main_font, lost_font), lag / TICK)
+        if show_overlay:
+            renderer.add(profiler.draw(WINDOW, overlay_font))
+        renderer.finish()
+        if profiler is not None:
+            profiler.mark("draw")
+            profiler.end_frame(game.counts())
+
+    if profiler is not None:
+        profiler.close()
+    if recorder is not None:
+        recorder.save(record_path)
+
+
+# Plays a recording back as fast as it goes, with no window when headless or drawing every update when not
+# Returns a report of how many updates were run and how fast
+def run_replay(path, headless=True, profile_csv=None):
+    recording = Recording.load(path)
+    game = Game(recording.seed)
+    profiler = FrameProfiler(1000 / TICK_RATE, profile_csv) if profile_csv is not None else None
+    game.profiler = profiler
+    if not headless:
+        main_font = pygame.font.SysFont("agencyfb", 50, True)
+        lost_font = pygame.font.SysFont("agencyfb", 80, True)
+        renderer = Renderer(WINDOW, background())
+
+    start = time.perf_counter()
+    for keys in recording.keys():
+        if profiler is not None:
+            profiler.begin_frame()
+        game.update(keys)
+        if not headless:
+            pygame.event.pump()
+            renderer.begin()
+            game.draw(renderer, (main_font, lost_font), 1.0)
+            renderer.finish()
+            if profiler is not None:
+                profiler.mark("draw")
+        if profiler is not None:
+            profiler.end_frame(game.counts())
+    seconds = time.perf_counter() - start
+    if profiler is not None:
+        profiler.close()
+    return {
+        "ticks": len(recording),
+        "seed": recording.seed,
+        "seconds": seconds,
+        "ticks_per_sec": len(recording) / seconds if seconds else 0.0,
+        "level": game.level,
+        "lives": game.lives,
+        "health": game.player.health,
+    }
+
+
+# Keys the headless mode holds down, a new random direction every so often and always shooting
+class RandomKeys:
+    # Updates between changes of direction
+    HOLD = 30
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.keys = {key: False for key in (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT)}
+        self.keys[pygame.K_SPACE] = True
+        self.ticks = 0
+
+    def next(self):
+        if self.ticks % self.HOLD == 0:
+            for key in (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT):
+                self.keys[key] = False
+            key = self.rng.choice((pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT, None))
+            if key is not None:
+                self.keys[key] = True
+        self.ticks += 1
+        return self.keys
+
+
+# Runs games with no window as fast as they go, a new one every time one is lost
+# Returns a report of how many updates were run and how fast
+# profile_csv is a file to write how long each part of every update took, see profiler.py
+def run_headless(ticks, seed=0, profile_csv=None):
+    keys = RandomKeys(seed)
+    games = 1
+    game = Game(seed)
+    levels = []
+    profiler = FrameProfiler(1000 / TICK_RATE, profile_csv) if profile_csv is not None else None
+    start = time.perf_counter()
+    for tick in range(ticks):
+        if game.over():
+            levels.append(game.level)
+            games += 1
+            game = Game(seed + games - 1)
+        if profiler is not None:
+            game.profiler = profiler
+            profiler.begin_frame()
+        game.update(keys.next())
+        if profiler is not None:
+            profiler.end_frame(game.counts())
+    seconds = time.perf_counter() - start
+    if profiler is not None:
+        profiler.close()
+    levels.append(game.level)
+    return {
+        "ticks": ticks,
+        "seed": seed,
+        "seconds": seconds,
+        "ticks_per_sec": ticks / seconds if seconds else 0.0,
+        "games": games,
+        "best_level": max(levels),
+    }
+
+
+def main_menu(seed=None, profile_csv=None, record_path=None):
     title_font = pygame.font.SysFont("agencyfb", 80, True)
     # This run is local (for main menu running) and has nothing to do with run in main funciton
     run = True
 
     while run == True:
-        WINDOW.blit(BG, (0,0))
+        WINDOW.blit(background(), (0,0))
         title_label = title_font.render("Press mouse to begin", 1, (255,255,255))
         WINDOW.blit(title_label, (WIDTH/2 - title_label.get_width()/2 , HEIGHT/2 - title_label.get_height()/2))
 
@@ -332,9 +653,36 @@ def main_menu():
                 run = False
             # If mouse buttons are pressed, then run is true and while loop from main funciton starts to play game
             if event.type == pygame.MOUSEBUTTONDOWN:
-                main()
+                main(seed, profile_csv, record_path)
     quit()
 
 
+# Starts the game from command line arguments, argv is the list of them (None for sys.argv)
+def run(argv=None):
+    parser = argparse.ArgumentParser(description="Space Invaders")
+    parser.add_argument("--headless", action="store_true", help="run the game with no window as fast as it goes and report the speed")
+    parser.add_argument("--ticks", type=int, default=100000, help="updates to run in headless mode")
+    parser.add_argument("--seed", type=int, help="seed for the enemies (and the headless mode's keys)")
+    parser.add_argument("--profile-csv", help="write how long each part of every frame took to this CSV file")
+    parser.add_argument("--record", help="save the game to this file to replay later")
+    parser.add_argument("--replay", help="play back a saved game as fast as possible (with --headless to not draw it)")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        if not args.headless:
+            open_window()
+        report = run_replay(args.replay, args.headless, args.profile_csv)
+        print(f"{report['ticks']} ticks in {report['seconds']:.2f}s, {report['ticks_per_sec']:.0f} ticks/s, "
+            f"ended on level {report['level']} with {report['lives']} lives and {report['health']} health")
+        sys.exit()
+    if args.headless:
+        report = run_headless(args.ticks, args.seed or 0, args.profile_csv)
+        print(f"{report['ticks']} ticks in {report['seconds']:.2f}s, {report['ticks_per_sec']:.0f} ticks/s, "
+            f"{report['games']} games, best level {report['best_level']}")
+        sys.exit()
+    open_window()
+    main_menu(args.seed, args.profile_csv, args.record)
+
+
 if __name__ == "__main__":
-    main_menu()
+    run()
@@ -0,0 +1,91 @@
+# Frame profiler for the game
+# Times every phase of every frame (events, each part of the update, drawing), keeps the last few seconds of them
+# for an on screen overlay (toggled with F3) and can write every frame to a CSV file with how many things were on screen.
+# The game only calls in here when a profiler is switched on, with it off the only cost is an "is None" check per phase.
+import collections
+import csv
+import time
+
+import numpy as np
+
+# In the order they happen in a frame
+PHASES = ("events", "spawn", "player", "enemy_lasers", "enemies", "player_lasers", "draw")
+
+
+class FrameProfiler:
+    # Frames the overlay's percentiles are worked out over
+    HISTORY = 300
+    # The overlay text is only rendered again this often, in frames
+    OVERLAY_REFRESH = 30
+
+    # frame_budget_ms is how long a frame can take before it counts as a spike
+    # csv_path is a file to write every frame to, None to only keep the history for the overlay
+    def __init__(self, frame_budget_ms, csv_path=None):
+        self.frame_budget_ms = frame_budget_ms
+        self.file = None
+        self.writer = None
+        if csv_path is not None:
+            self.file = open(csv_path, "w", newline="")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(("frame", "frame_ms") + tuple(f"{phase}_ms" for phase in PHASES) +
+                ("updates", "level", "enemies", "lasers"))
+        self.frame = 0
+        # Each row is one frame: total ms then ms for each phase
+        self.history = collections.deque(maxlen=self.HISTORY)
+        self.phase_times = dict.fromkeys(PHASES, 0.0)
+        self.frame_start = None
+        self.last_mark = None
+        self.updates = 0
+        self.overlay_lines = []
+        self.overlay_surfaces = []
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+    def begin_frame(self):
+        for phase in PHASES:
+            self.phase_times[phase] = 0.0
+        self.updates = 0
+        self.frame_start = self.last_mark = time.perf_counter()
+
+    # Everything since the last mark gets counted towards phase, the same phase can come up more than once a frame
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phase_times[phase] += now - self.last_mark
+        self.last_mark = now
+
+    # counts is (level, enemies, lasers) at the end of the frame
+    def end_frame(self, counts):
+        frame_ms = 1000 * (time.perf_counter() - self.frame_start)
+        phase_ms = [1000 * self.phase_times[phase] for phase in PHASES]
+        self.frame += 1
+        self.history.append([frame_ms] + phase_ms)
+        if self.writer is not None:
+            self.writer.writerow([self.frame, f"{frame_ms:.3f}"] + [f"{ms:.3f}" for ms in phase_ms] + [self.updates] + list(counts))
+
+    # Lines of text for the overlay: 50th, 95th and 99th percentile of each phase and the frame, and the spikes
+    def summary(self):
+        if not self.history:
+            return []
+        times = np.array(self.history)
+        p50, p95, p99 = np.percentile(times, (50, 95, 99), axis=0)
+        frames = times[:, 0]
+        spikes = frames > self.frame_budget_ms
+        lines = [f"last {len(frames)} frames       p50    p95    p99   (ms)"]
+        for i, name in enumerate(("frame",) + PHASES):
+            lines.append(f"{name:<14}{p50[i]:>7.2f}{p95[i]:>7.2f}{p99[i]:>7.2f}")
+        lines.append(f"spikes over {self.frame_budget_ms:.1f}ms: {spikes.sum()}, worst {frames.max():.1f}ms")
+        return lines
+
+    # Draws the overlay in the top left corner, returns the rects it drew over
+    def draw(self, window, font):
+        if self.frame % self.OVERLAY_REFRESH == 0 or not self.overlay_surfaces:
+            self.overlay_lines = self.summary()
+            self.overlay_surfaces = [font.render(line, 1, (255, 255, 0), (0, 0, 0)) for line in self.overlay_lines]
+        rects = []
+        y = 60
+        for surface in self.overlay_surfaces:
+            rects.append(window.blit(surface, (10, y)))
+            y += surface.get_height()
+        return rects
@@ -0,0 +1,68 @@
+# Draws the game changing only the parts of the screen that need it
+# Every frame the rects drawn last frame are wiped back to the background, everything is drawn again on top in layers
+# (text, enemies, lasers, player) and only the wiped and drawn rects get sent to the display
+import pygame
+
+
+class Renderer:
+    # Past this many rects one update of the whole window is quicker than updating each of them
+    MAX_DIRTY_RECTS = 150
+
+    def __init__(self, window, background):
+        self.window = window
+        self.background = background
+        # Rects drawn over last frame, wiped at the start of this one
+        self.last_rects = []
+        # Rects drawn over this frame
+        self.rects = []
+        # Rects whose pixels changed without being drawn over this frame (like text that changed and got shorter)
+        self.changed = []
+        # name -> (text, surface, rect) of each label, text is only rendered again when it changes
+        self.labels = {}
+        # The first frame draws and updates the whole window
+        self.full = True
+
+    # Call before drawing a frame
+    def begin(self):
+        if self.full:
+            self.window.blit(self.background, (0, 0))
+        else:
+            self.window.blits([(self.background, rect, rect) for rect in self.last_rects], False)
+        self.rects = []
+        self.changed = []
+
+    # Rects something was drawn in this frame, as returned by blit, blits or pygame.draw
+    def add(self, rects):
+        self.rects.extend(rects)
+
+    # Draws text, rendering it again only if it is different from last time this label was drawn
+    # pos is where the top left goes, or a function from the rendered surface's size to it (for text lined up on the right)
+    # Text that doesnt change never needs updating on its own: it is drawn again every frame over whatever got wiped,
+    # so only draw labels that change before the things that can go over them
+    def label(self, name, font, text, color, pos):
+        cached = self.labels.get(name)
+        if cached is None or cached[0] != text:
+            text_surface = font.render(text, 1, color)
+            if callable(pos):
+                pos = pos(text_surface.get_width(), text_surface.get_height())
+            rect = text_surface.get_rect(topleft=(int(pos[0]), int(pos[1]))).clip(self.window.get_rect())
+            # Text is kept on top of a copy of the background behind it: the edges of the letters are see through,
+            # so drawing the text alone again and again over itself would keep making them darker
+            surface = self.background.subsurface(rect).copy()
+            surface.blit(text_surface, (0, 0))
+            if cached is not None:
+                self.window.blit(self.background, cached[2], cached[2])
+                self.changed.append(cached[2])
+            self.changed.append(rect)
+            self.labels[name] = cached = (text, surface, rect)
+        self.window.blit(cached[1], cached[2])
+
+    # Sends this frame's changes to the display
+    def finish(self):
+        dirty = self.last_rects + self.rects + self.changed
+        if self.full or len(dirty) > self.MAX_DIRTY_RECTS:
+            pygame.display.update()
+        else:
+            pygame.display.update(dirty)
+        self.full = False
+        self.last_rects = self.rects
@@ -0,0 +1,70 @@
+# Recording and replaying games
+# A game plays out the same for the same seed and the same keys on every update, so a recording is just those:
+#   header   magic "SIRP", version (1 byte), seed (8 bytes), number of updates (4 bytes), little endian
+#   inputs   one byte per update, bit i set if KEYS[i] was held down
+# A few minutes of play is a few kilobytes, and replaying it gives the exact same game every time.
+import struct
+
+import pygame
+
+MAGIC = b"SIRP"
+# Goes up when the game changes in a way that makes old recordings play out differently
+VERSION = 2
+HEADER = struct.Struct("<4sBqI")
+
+# Keys the game reads, in bit order
+KEYS = (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT, pygame.K_SPACE)
+
+# Keys for every bitmask, in the same shape Game.update reads pygame.key.get_pressed()
+KEY_STATES = [{key: bool(bits >> i & 1) for i, key in enumerate(KEYS)} for bits in range(1 << len(KEYS))]
+
+
+def key_bits(keys):
+    bits = 0
+    for i, key in enumerate(KEYS):
+        if keys[key]:
+            bits |= 1 << i
+    return bits
+
+
+class Recorder:
+    def __init__(self, seed):
+        self.seed = seed
+        self.inputs = bytearray()
+
+    # Call with the keys given to every update
+    def record(self, keys):
+        self.inputs.append(key_bits(keys))
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, len(self.inputs)))
+            f.write(self.inputs)
+
+
+class Recording:
+    def __init__(self, seed, inputs):
+        self.seed = seed
+        self.inputs = inputs
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, seed, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a Space Invaders recording")
+        if version != VERSION:
+            raise ValueError(f"{path} was recorded with version {version} of the game, this is version {VERSION}")
+        inputs = data[HEADER.size:HEADER.size + count]
+        if len(inputs) != count:
+            raise ValueError(f"{path} is cut short, expected {count} updates but it has {len(inputs)}")
+        return cls(seed, inputs)
+
+    def __len__(self):
+        return len(self.inputs)
+
+    # Keys for each update in order
+    def keys(self):
+        for bits in self.inputs:
+            yield KEY_STATES[bits]
@@ -0,0 +1,25 @@
+# Things to happen on a later update, kept in a heap by the update they are due on
+# so instead of checking every enemy every update the game only looks at what is due now
+import heapq
+
+
+class Scheduler:
+    def __init__(self):
+        # (tick, order it was added in, event), the order keeps events due on the same tick first in first out
+        self.queue = []
+        self.added = 0
+
+    def __len__(self):
+        return len(self.queue)
+
+    def schedule(self, tick, event):
+        heapq.heappush(self.queue, (tick, self.added, event))
+        self.added += 1
+
+    # Takes every event due on or before tick out of the queue
+    def due(self, tick):
+        queue = self.queue
+        events = []
+        while queue and queue[0][0] <= tick:
+            events.append(heapq.heappop(queue)[2])
+        return events